@@ -1,51 +1,66 @@
-from typing import Any, Dict, List, Optional
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import anthropic
+import httpx
+
+# Shared by every tool-enabled request; the SDK only reads it
+_AUTO_TOOL_CHOICE = {"type": "auto"}
+
+# Fail fast on connect, but leave room for a full 800-token completion
+_REQUEST_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Independent tool calls from one response run side by side on this pool. It
+# is shared by every generator, so generators own no threads of their own
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool-call")
+
+# Roughly 6000 tokens of tool output; past this, older results are stubbed out
+_MAX_TOOL_RESULT_CHARS = 24000
+_OMITTED_PREFIX = "[tool_result omitted:"
+
+# Static system prompt, loaded and interned once so every request sends the
+# same string object; edit prompts/system.txt to change it
+SYSTEM_PROMPT = sys.intern(
+    (Path(__file__).parent / "prompts" / "system.txt").read_text(encoding="utf-8")
+)
+
+# Static prompt block, built once and shared read-only by every request. It has
+# no cache_control breakpoint: together with the tool definitions it is well
+# under the model's 1024-token minimum for prompt caching, so a breakpoint
+# would never produce a cache hit.
+_SYSTEM_PROMPT_BLOCK = ({"type": "text", "text": SYSTEM_PROMPT},)
+
+
+# Yielded by generate_response_stream when the text streamed so far in a round
+# led into a tool call; consumers should discard it
+STREAM_RESET = object()
+
+
+class GenerationError(Exception):
+    """A tool round or API call failed; the message is fit to show the user"""
 
 
 class AIGenerator:
     """Handles interactions with Anthropic's Claude API for generating responses"""
 
-    # Static system prompt to avoid rebuilding on each call
-    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to comprehensive search tools for course information.
-
-Search Tool Usage:
-- **Content Search Tool**: Use for questions about specific course content or detailed educational materials
-- **Course Outline Tool**: Use for questions about course structure, lesson lists, or course overviews
-- **Multi-Step Search Protocol**: You can make up to 2 tool calls in separate rounds to fully answer complex questions
-- Use additional searches when initial results don't provide complete information
-- Examples requiring multiple searches:
-  * Comparing content across different courses/lessons
-  * Multi-part questions requiring different search strategies
-  * When initial search reveals need for more specific follow-up search
-- Always synthesize information from all searches in your final response
-- If first search answers the question completely, provide final response without additional tools
-- Synthesize search results into accurate, fact-based responses
-- If search yields no results, state this clearly without offering alternatives
-
-Response Protocol:
-- **General knowledge questions**: Answer using existing knowledge without searching
-- **Course-specific content questions**: Use content search tool first, then answer
-- **Course outline/structure questions**: Use outline tool to get complete course information including title, course link, and all lessons
-- **No meta-commentary**:
- - Provide direct answers only — no reasoning process, search explanations, or question-type analysis
- - Do not mention "based on the search results"
-
-For course outline queries, always include:
-- Course title
-- Course link 
-- Complete numbered lesson list with titles
-
-All responses must be:
-1. **Brief, Concise and focused** - Get to the point quickly
-2. **Educational** - Maintain instructional value
-3. **Clear** - Use accessible language
-4. **Example-supported** - Include relevant examples when they aid understanding
-Provide only the direct answer to what was asked.
-"""
-
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    # Static system prompt, kept on the class for callers and tests
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    def __init__(
+        self, api_key: str, model: str, *, client: Optional[anthropic.Anthropic] = None
+    ):
+        # One pooled HTTP/2 connection carries every round of every request,
+        # unless the caller supplies a ready-made client
+        if client is None:
+            client = anthropic.Anthropic(
+                api_key=api_key,
+                timeout=_REQUEST_TIMEOUT,
+                http_client=anthropic.DefaultHttpxClient(http2=True),
+            )
+        self.client = client
         self.model = model
 
         # Pre-build base API parameters
@@ -58,6 +73,7 @@ Provide only the direct answer to what was asked.
         tools: Optional[List] = None,
         tool_manager=None,
         max_rounds: int = 2,
+        max_tokens: Optional[int] = None,
     ) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
@@ -68,60 +84,268 @@ Provide only the direct answer to what was asked.
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
             max_rounds: Maximum number of sequential tool calling rounds (default: 2)
+            max_tokens: Optional per-request override of the output token limit
 
         Returns:
             Generated response as string
+
+        Raises:
+            GenerationError: A tool round or API call failed in sequential mode
         """
 
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
-        )
+        system_content = self._build_system_content(conversation_history)
+        base_params = self._base_params_for(max_tokens)
 
         # Use sequential rounds if tools are available and max_rounds > 1
         if tools and tool_manager and max_rounds > 1:
             return self._execute_sequential_rounds(
-                query, system_content, tools, tool_manager, max_rounds
+                query, system_content, tools, tool_manager, max_rounds, base_params
             )
 
         # Fall back to single-round behavior for backward compatibility
-        return self._execute_single_round(query, system_content, tools, tool_manager)
+        return self._execute_single_round(
+            query, system_content, tools, tool_manager, base_params
+        )
+
+    def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        max_rounds: int = 2,
+        max_tokens: Optional[int] = None,
+    ) -> Iterator[Union[str, object]]:
+        """
+        Stream an AI response as text deltas, running tool rounds in between.
+
+        Follows the same round structure as generate_response: up to
+        max_rounds calls may use tools, then a final call without tools
+        synthesizes the answer. Every call streams token by token. If a round
+        ends in a tool call, the text it streamed ("Let me search...") is not
+        part of the answer, as in generate_response, so STREAM_RESET follows
+        it and consumers discard what they have collected.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            max_rounds: Maximum number of sequential tool calling rounds (default: 2)
+            max_tokens: Optional per-request override of the output token limit
+
+        Yields:
+            Response text chunks in the order they are generated, and
+            STREAM_RESET after a tool round that streamed text
+
+        Raises:
+            GenerationError: An API call or tool round failed
+        """
+        system_content = self._build_system_content(conversation_history)
+        messages = [{"role": "user", "content": query}]
+        use_tools = bool(tools and tool_manager)
+
+        # messages is extended in place, so both parameter sets stay current
+        final_params = dict(
+            self._base_params_for(max_tokens), messages=messages, system=system_content
+        )
+        tool_params = dict(final_params, tools=tools, tool_choice=_AUTO_TOOL_CHOICE)
+
+        for round_number in range(1, max_rounds + 2):
+            offer_tools = use_tools and round_number <= max_rounds
+            api_params = tool_params if offer_tools else final_params
+
+            streamed_text = False
+            try:
+                with self.client.messages.stream(**api_params) as stream:
+                    for text in stream.text_stream:
+                        streamed_text = True
+                        yield text
+                    response = stream.get_final_message()
+            except Exception as e:
+                raise GenerationError(f"Error in round {round_number}: {e}") from e
+
+            if not offer_tools or response.stop_reason != "tool_use":
+                return
+
+            if streamed_text:
+                yield STREAM_RESET
+
+            messages.append({"role": "assistant", "content": response.content})
+            try:
+                tool_results = self._execute_tool_calls(response, tool_manager)
+            except Exception as e:
+                raise GenerationError(f"Tool execution failed: {e}") from e
+
+            if tool_results:
+                messages.append({"role": "user", "content": tool_results})
+                self._compact_tool_results(messages)
+
+    def _base_params_for(self, max_tokens: Optional[int]) -> Dict[str, Any]:
+        """Return the base API parameters, with max_tokens overridden if given"""
+        if max_tokens is None:
+            return self.base_params
+        return dict(self.base_params, max_tokens=max_tokens)
+
+    def _build_system_content(
+        self, conversation_history: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Build the system blocks: static prompt, then session history"""
+        # The per-session history follows the shared prompt block
+        system_content = list(_SYSTEM_PROMPT_BLOCK)
+        if conversation_history:
+            system_content.append(
+                {
+                    "type": "text",
+                    "text": f"Previous conversation:\n{conversation_history}",
+                }
+            )
+        return system_content
+
+    def _execute_tool_calls(self, response, tool_manager) -> List[Dict[str, Any]]:
+        """
+        Execute every tool call in a response.
+
+        Identical calls (same tool and input) in one response run only once;
+        each tool_use_id still gets its own tool_result. Distinct calls run
+        concurrently on the tool pool, each on its own copy of the tools, and
+        both results and sources keep the response's order.
+
+        Args:
+            response: Claude response containing tool_use blocks
+            tool_manager: Manager to execute tools
+
+        Returns:
+            List of tool_result blocks for the next user message
+
+        Raises:
+            Exception: The first failing tool call, in response order
+        """
+        tool_blocks = []
+        calls: Dict[Tuple[str, str], Any] = {}
+        for content_block in response.content:
+            if content_block.type == "tool_use":
+                key = (
+                    content_block.name,
+                    json.dumps(content_block.input, sort_keys=True),
+                )
+                calls.setdefault(key, content_block)
+                tool_blocks.append((key, content_block))
+
+        if len(calls) == 1:
+            # Nothing to overlap with, so skip the thread handoff
+            [(key, block)] = calls.items()
+            results = {key: tool_manager.execute_tool(block.name, **block.input)}
+        else:
+            # Tools record their sources on the instance, so concurrent calls
+            # must not share one; the copies' sources are merged back below
+            call_managers = {key: tool_manager.for_request() for key in calls}
+            futures = {
+                key: _TOOL_POOL.submit(
+                    call_managers[key].execute_tool, block.name, **block.input
+                )
+                for key, block in calls.items()
+            }
+            results = {key: future.result() for key, future in futures.items()}
+            tool_manager.merge_sources(list(call_managers.values()))
+
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": content_block.id,
+                "content": results[key],
+            }
+            for key, content_block in tool_blocks
+        ]
+
+    @staticmethod
+    def _compact_tool_results(messages: List[Dict[str, Any]]):
+        """
+        Keep resent tool output bounded across rounds.
+
+        Once the tool results in messages exceed _MAX_TOOL_RESULT_CHARS, every
+        tool_result except those in the latest round is replaced with a one-line
+        stub. The query and the latest assistant/tool_result pair stay verbatim.
+
+        Args:
+            messages: Conversation so far; compacted in place
+        """
+        tool_turns = [
+            message
+            for message in messages
+            if message["role"] == "user" and isinstance(message["content"], list)
+        ]
+        total_chars = sum(
+            len(str(block["content"]))
+            for turn in tool_turns
+            for block in turn["content"]
+        )
+        if len(tool_turns) < 2 or total_chars <= _MAX_TOOL_RESULT_CHARS:
+            return
+
+        tool_names = {
+            block.id: block.name
+            for message in messages
+            if message["role"] == "assistant"
+            for block in message["content"]
+            if block.type == "tool_use"
+        }
+        for turn in tool_turns[:-1]:
+            turn["content"] = [
+                (
+                    block
+                    if str(block["content"]).startswith(_OMITTED_PREFIX)
+                    else {
+                        **block,
+                        "content": f"{_OMITTED_PREFIX} {len(str(block['content']))} "
+                        f"chars from {tool_names.get(block['tool_use_id'], 'tool')}]",
+                    }
+                )
+                for block in turn["content"]
+            ]
 
     def _execute_single_round(
-        self, query: str, system_content: str, tools: Optional[List], tool_manager
+        self,
+        query: str,
+        system_content: List[Dict[str, Any]],
+        tools: Optional[List],
+        tool_manager,
+        base_params: Dict[str, Any],
     ) -> str:
         """
         Execute single-round tool calling (original behavior for backward compatibility).
 
         Args:
             query: The user's question
-            system_content: System prompt with context
+            system_content: System prompt blocks with context
             tools: Available tools
             tool_manager: Manager to execute tools
+            base_params: Model, temperature and max_tokens for this request
 
         Returns:
             Generated response as string
         """
         # Prepare API call parameters efficiently
-        api_params = {
-            **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content,
-        }
-
-        # Add tools if available
+        messages = [{"role": "user", "content": query}]
         if tools:
-            api_params["tools"] = tools
-            api_params["tool_choice"] = {"type": "auto"}
+            api_params = dict(
+                base_params,
+                messages=messages,
+                system=system_content,
+                tools=tools,
+                tool_choice=_AUTO_TOOL_CHOICE,
+            )
+        else:
+            api_params = dict(base_params, messages=messages, system=system_content)
 
         # Get response from Claude
         response = self.client.messages.create(**api_params)
 
         # Handle tool execution if needed
         if response.stop_reason == "tool_use" and tool_manager:
-            return self._handle_tool_execution(response, api_params, tool_manager)
+            return self._handle_tool_execution(
+                response, messages, system_content, tool_manager, base_params
+            )
 
         # Return direct response
         return response.content[0].text
@@ -129,38 +353,38 @@ Provide only the direct answer to what was asked.
     def _execute_sequential_rounds(
         self,
         query: str,
-        system_content: str,
+        system_content: List[Dict[str, Any]],
         tools: List,
         tool_manager,
         max_rounds: int,
+        base_params: Dict[str, Any],
     ) -> str:
         """
         Execute up to max_rounds of sequential tool calling with Claude.
 
         Args:
             query: The user's question
-            system_content: System prompt with context
+            system_content: System prompt blocks with context
             tools: Available tools
             tool_manager: Manager to execute tools
             max_rounds: Maximum number of rounds to execute
+            base_params: Model, temperature and max_tokens for this request
 
         Returns:
             Final response text
+
+        Raises:
+            GenerationError: An API call or tool round failed
         """
         # Initialize message history with user query
         messages = [{"role": "user", "content": query}]
 
+        # Build API call parameters once; messages is extended in place
+        final_params = dict(base_params, messages=messages, system=system_content)
+        api_params = dict(final_params, tools=tools, tool_choice=_AUTO_TOOL_CHOICE)
+
         for round_number in range(1, max_rounds + 1):
             try:
-                # Prepare API call parameters
-                api_params = {
-                    **self.base_params,
-                    "messages": messages,
-                    "system": system_content,
-                    "tools": tools,
-                    "tool_choice": {"type": "auto"},
-                }
-
                 # Get response from Claude
                 response = self.client.messages.create(**api_params)
 
@@ -173,92 +397,65 @@ Provide only the direct answer to what was asked.
                 messages.append({"role": "assistant", "content": response.content})
 
                 # Execute all tool calls and collect results
-                tool_results = []
-                for content_block in response.content:
-                    if content_block.type == "tool_use":
-                        try:
-                            tool_result = tool_manager.execute_tool(
-                                content_block.name, **content_block.input
-                            )
-
-                            tool_results.append(
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": content_block.id,
-                                    "content": tool_result,
-                                }
-                            )
-                        except Exception as e:
-                            # Tool execution error - graceful termination
-                            return f"Tool execution failed: {str(e)}"
+                try:
+                    tool_results = self._execute_tool_calls(response, tool_manager)
+                except Exception as e:
+                    # Tool execution error - graceful termination
+                    raise GenerationError(f"Tool execution failed: {e}") from e
 
                 # Add tool results as user message
                 if tool_results:
                     messages.append({"role": "user", "content": tool_results})
+                    self._compact_tool_results(messages)
 
                 # If this is the last round, get final response without tools
                 if round_number >= max_rounds:
-                    final_params = {
-                        **self.base_params,
-                        "messages": messages,
-                        "system": system_content,
-                    }
                     final_response = self.client.messages.create(**final_params)
                     return final_response.content[0].text
 
+            except GenerationError:
+                raise
             except Exception as e:
-                # API error - return error message
-                return f"Error in round {round_number}: {str(e)}"
+                # API error - report it apart from any answer text
+                raise GenerationError(f"Error in round {round_number}: {e}") from e
 
         # Should not reach here, but fallback just in case
         return "Maximum rounds completed without final response."
 
     def _handle_tool_execution(
-        self, initial_response, base_params: Dict[str, Any], tool_manager
+        self,
+        initial_response,
+        messages: List[Dict[str, Any]],
+        system_content: List[Dict[str, Any]],
+        tool_manager,
+        base_params: Dict[str, Any],
     ):
         """
         Handle execution of tool calls and get follow-up response.
 
         Args:
             initial_response: The response containing tool use requests
-            base_params: Base API parameters
+            messages: Conversation so far; extended in place, so callers
+                must not reuse it afterwards
+            system_content: System prompt blocks with context
             tool_manager: Manager to execute tools
+            base_params: Model, temperature and max_tokens for this request
 
         Returns:
             Final response text after tool execution
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
-
         # Add AI's tool use response
         messages.append({"role": "assistant", "content": initial_response.content})
 
         # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
-
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
+        tool_results = self._execute_tool_calls(initial_response, tool_manager)
 
         # Add tool results as single message
         if tool_results:
             messages.append({"role": "user", "content": tool_results})
 
         # Prepare final API call without tools
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": base_params["system"],
-        }
+        final_params = dict(base_params, messages=messages, system=system_content)
 
         # Get final response
         final_response = self.client.messages.create(**final_params)
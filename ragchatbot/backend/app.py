@@ -2,6 +2,7 @@ import warnings
 
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
 
+import json
 import os
 from typing import Any, Dict, List, Optional
 
@@ -9,6 +10,7 @@ from config import config
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from rag_system import RAGSystem
@@ -70,10 +72,12 @@ class NewSessionResponse(BaseModel):
 
 
 # API Endpoints
+# Handlers are plain functions so FastAPI runs them in its threadpool; the
+# blocking Claude/ChromaDB calls then no longer stall the event loop.
 
 
 @app.post("/api/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+def query_documents(request: QueryRequest):
     """Process a query and return response with sources"""
     try:
         # Create session if not provided
@@ -89,8 +93,28 @@ async def query_documents(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/query/stream")
+def stream_query(request: QueryRequest):
+    """Process a query and stream the answer as server-sent events"""
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+
+    def event_stream():
+        try:
+            for event in rag_system.query_stream(request.query, session_id):
+                if event["type"] == "done":
+                    event = {**event, "session_id": session_id}
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/courses", response_model=CourseStats)
-async def get_course_stats():
+def get_course_stats():
     """Get course analytics and statistics"""
     try:
         analytics = rag_system.get_course_analytics()
@@ -103,7 +127,7 @@ async def get_course_stats():
 
 
 @app.post("/api/new-session", response_model=NewSessionResponse)
-async def start_new_session(request: NewSessionRequest):
+def start_new_session(request: NewSessionRequest):
     """Start a new conversation session and optionally clear old one"""
     try:
         # Clear old session if provided
@@ -30,5 +30,11 @@ class Config:
     # Tool calling settings
     MAX_TOOL_ROUNDS: int = 2  # Maximum sequential tool calling rounds
 
+    # Semantic response cache settings
+    SEMANTIC_CACHE_ENABLED: bool = False  # Reuse answers to near-identical queries
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL: int = 3600  # Seconds before a cached answer expires
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 500  # Oldest entries are evicted beyond this
+
 
 config = Config()
@@ -0,0 +1,68 @@
+import re
+from typing import Optional
+
+# Conversational messages that never need a course search
+_SMALL_TALK = re.compile(
+    r"^(hi|hello|hey|thanks|thank you|thx|ok|okay|bye|goodbye|"
+    r"good (morning|afternoon|evening)|how are you|who are you|what can you do)"
+    r"( there)?[\s!.?,]*$",
+    re.IGNORECASE,
+)
+
+# Bare arithmetic such as "2 + 2" or "what is 12 * 7?"
+_ARITHMETIC = re.compile(
+    r"^(what is |what's |calculate )?[\d\s+\-*/().^%=]+\??$", re.IGNORECASE
+)
+
+
+# Requests for a course's structure; answers are a title, link and lesson list
+_OUTLINE = re.compile(
+    r"\b(outline|syllabus|structure|overview|lesson list|"
+    r"list (of |all |the )*lessons|what lessons)\b",
+    re.IGNORECASE,
+)
+
+# Questions about specific course material
+_CONTENT = re.compile(r"\b(course|lesson|module|chapter)s?\b", re.IGNORECASE)
+
+# Output token limits per query class; the generator's default applies otherwise
+OUTLINE_MAX_TOKENS = 400
+CONTENT_MAX_TOKENS = 600
+
+
+def is_general_query(query: str) -> bool:
+    """
+    Check whether a query can be answered without the course search tools.
+
+    Deliberately conservative: only small talk and bare arithmetic qualify.
+    The course catalog covers general AI topics, so anything that reads as a
+    real question is left to Claude and its tools.
+
+    Args:
+        query: The user's raw question
+
+    Returns:
+        True if the query needs no tools
+    """
+    text = query.strip()
+    if not text:
+        return False
+    return bool(_SMALL_TALK.match(text) or _ARITHMETIC.match(text))
+
+
+def max_tokens_for(query: str) -> Optional[int]:
+    """
+    Pick an output token limit that fits the kind of answer a query needs.
+
+    Args:
+        query: The user's raw question
+
+    Returns:
+        A tighter limit for outline or course-content questions, or None to
+        keep the generator's default
+    """
+    if _OUTLINE.search(query):
+        return OUTLINE_MAX_TOKENS
+    if _CONTENT.search(query):
+        return CONTENT_MAX_TOKENS
+    return None
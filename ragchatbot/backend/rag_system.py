@@ -1,9 +1,12 @@
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
 
-from ai_generator import AIGenerator
+from ai_generator import STREAM_RESET, AIGenerator, GenerationError
 from document_processor import DocumentProcessor
 from models import Course, CourseChunk, Lesson
+from query_classifier import is_general_query, max_tokens_for
+from request_coalescer import RequestCoalescer
+from response_cache import SemanticCache
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 from session_manager import SessionManager
 from vector_store import VectorStore
@@ -34,6 +37,20 @@ class RAGSystem:
         self.tool_manager.register_tool(self.search_tool)
         self.tool_manager.register_tool(self.outline_tool)
 
+        # Optional semantic cache, sharing the vector store's client and model
+        self.response_cache = None
+        if config.SEMANTIC_CACHE_ENABLED:
+            self.response_cache = SemanticCache(
+                self.vector_store.client,
+                self.vector_store.embedding_function,
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=config.SEMANTIC_CACHE_TTL,
+                max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            )
+
+        # Identical queries arriving while one is in flight share its answer
+        self._coalescer = RequestCoalescer()
+
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
         Add a single course document to the knowledge base.
@@ -50,11 +67,9 @@ class RAGSystem:
                 file_path
             )
 
-            # Add course metadata to vector store for semantic search
-            self.vector_store.add_course_metadata(course)
-
-            # Add course content chunks to vector store
-            self.vector_store.add_course_content(course_chunks)
+            # Add course metadata and content chunks to vector store
+            self.vector_store.add_course(course, course_chunks)
+            self._clear_response_cache()
 
             return course, len(course_chunks)
         except Exception as e:
@@ -81,6 +96,7 @@ class RAGSystem:
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            self._clear_response_cache()
 
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
@@ -104,8 +120,7 @@ class RAGSystem:
 
                     if course and course.title not in existing_course_titles:
                         # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
+                        self.vector_store.add_course(course, course_chunks)
                         total_courses += 1
                         total_chunks += len(course_chunks)
                         print(
@@ -117,8 +132,16 @@ class RAGSystem:
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
 
+        if total_courses:
+            self._clear_response_cache()
+
         return total_courses, total_chunks
 
+    def _clear_response_cache(self):
+        """Drop cached answers, which may cite courses that changed or vanished"""
+        if self.response_cache:
+            self.response_cache.clear()
+
     def query(
         self, query: str, session_id: Optional[str] = None
     ) -> Tuple[str, List[str]]:
@@ -132,28 +155,27 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
-        # Create prompt for the AI with clear instructions
-        prompt = f"""Answer this question about course materials: {query}"""
-
         # Get conversation history if session exists
         history = None
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
 
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager,
-            max_rounds=self.config.MAX_TOOL_ROUNDS,
-        )
-
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
+        # Answers depend on prior turns, so only stand-alone queries are cached
+        cache_embedding = None
+        if self.response_cache and not history:
+            cache_embedding = self.response_cache.embed(query)
+            cached = self.response_cache.lookup(cache_embedding)
+            if cached:
+                response, sources = cached
+                if session_id:
+                    self.session_manager.add_exchange(session_id, query, response)
+                return response, sources
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        # Equivalent queries against the same history can share one answer
+        key = (RequestCoalescer.normalize(query), history or "")
+        response, sources = self._coalescer.run(
+            key, lambda: self._generate_answer(query, history, cache_embedding)
+        )
 
         # Update conversation history
         if session_id:
@@ -162,6 +184,146 @@ class RAGSystem:
         # Return response with sources from tool searches
         return response, sources
 
+    def _generate_answer(
+        self,
+        query: str,
+        history: Optional[str],
+        cache_embedding: Optional[List[float]],
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Run the tool-enabled generation for a query and collect its sources"""
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        # Small talk never needs a search, so skip the tool rounds entirely
+        use_tools = not is_general_query(query)
+
+        # Each query searches with its own tools, so their sources stay private
+        tool_manager = self.tool_manager.for_request() if use_tools else None
+
+        # Generate response using AI with tools
+        failed = False
+        try:
+            response = self.ai_generator.generate_response(
+                query=prompt,
+                conversation_history=history,
+                tools=tool_manager.get_tool_definitions() if use_tools else None,
+                tool_manager=tool_manager,
+                max_rounds=self.config.MAX_TOOL_ROUNDS,
+                max_tokens=max_tokens_for(query),
+            )
+        except GenerationError as e:
+            # Shown to the user like an answer, but never cached
+            response = str(e)
+            failed = True
+
+        # Get sources from this query's searches
+        sources = tool_manager.get_last_sources() if use_tools else []
+
+        if cache_embedding is not None and not failed:
+            self.response_cache.add(cache_embedding, query, response, sources)
+
+        return response, sources
+
+    def query_stream(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user query, streaming the answer as it is generated.
+
+        A query identical to one already being answered waits for that answer
+        and receives it as a single delta instead of generating it again.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "delta", "text": ...} events for each chunk of the answer,
+            a {"type": "reset"} event when the text so far should be discarded,
+            then a single {"type": "done", "sources": [...]} event
+        """
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        cache_embedding = None
+        if self.response_cache and not history:
+            cache_embedding = self.response_cache.embed(query)
+            cached = self.response_cache.lookup(cache_embedding)
+            if cached:
+                response, sources = cached
+                if session_id:
+                    self.session_manager.add_exchange(session_id, query, response)
+                yield {"type": "delta", "text": response}
+                yield {"type": "done", "sources": sources}
+                return
+
+        # Shares the key of query(), so either path can join the other's answer
+        key = (RequestCoalescer.normalize(query), history or "")
+        future, is_leader = self._coalescer.claim(key)
+        if is_leader:
+            try:
+                response, sources = yield from self._stream_answer(
+                    query, history, cache_embedding
+                )
+            except BaseException as e:
+                # Also reached when the client disconnects mid-stream
+                self._coalescer.settle(key, error=e)
+                raise
+            self._coalescer.settle(key, result=(response, sources))
+        else:
+            # An identical query is already generating; send its answer whole
+            response, sources = self._coalescer.wait(future)
+            yield {"type": "delta", "text": response}
+
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, response)
+
+        yield {"type": "done", "sources": sources}
+
+    def _stream_answer(
+        self,
+        query: str,
+        history: Optional[str],
+        cache_embedding: Optional[List[float]],
+    ) -> Generator[Dict[str, Any], None, Tuple[str, List[Dict[str, Any]]]]:
+        """Stream the tool-enabled generation as delta events; return its answer"""
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        use_tools = not is_general_query(query)
+        tool_manager = self.tool_manager.for_request() if use_tools else None
+
+        chunks = []
+        failed = False
+        try:
+            for text in self.ai_generator.generate_response_stream(
+                query=prompt,
+                conversation_history=history,
+                tools=tool_manager.get_tool_definitions() if use_tools else None,
+                tool_manager=tool_manager,
+                max_rounds=self.config.MAX_TOOL_ROUNDS,
+                max_tokens=max_tokens_for(query),
+            ):
+                if text is STREAM_RESET:
+                    # Text ahead of a tool call is not part of the answer
+                    chunks.clear()
+                    yield {"type": "reset"}
+                    continue
+                chunks.append(text)
+                yield {"type": "delta", "text": text}
+        except GenerationError as e:
+            # Streamed to the user like an answer, but never cached
+            chunks.append(str(e))
+            yield {"type": "delta", "text": str(e)}
+            failed = True
+
+        sources = tool_manager.get_last_sources() if use_tools else []
+
+        response = "".join(chunks)
+        if cache_embedding is not None and not failed:
+            self.response_cache.add(cache_embedding, query, response, sources)
+
+        return response, sources
+
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
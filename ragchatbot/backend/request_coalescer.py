@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class RequestCoalescer:
+    """Lets concurrent identical requests share a single in-flight call"""
+
+    def __init__(self, wait_timeout: float = 300.0):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase and collapse whitespace so trivially different text matches"""
+        return " ".join(text.lower().split())
+
+    def claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Join the call in flight for key, or start a new one.
+
+        Args:
+            key: Identifies equivalent requests
+
+        Returns:
+            Tuple of (shared future, whether the caller leads). A leader must
+            settle the key once it is done; everyone else waits on the future.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+        return future, is_leader
+
+    def settle(
+        self,
+        key: Hashable,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ):
+        """Hand the leader's result or error to every waiter and free the key"""
+        with self._lock:
+            future = self._in_flight.pop(key)
+        if error is not None:
+            if not isinstance(error, Exception):
+                # Interrupts and cancellations stop the leader, not its waiters
+                error = RuntimeError("Identical request was abandoned")
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def wait(self, future: Future) -> Any:
+        """Block on a leader's future, giving up after wait_timeout seconds"""
+        return future.result(timeout=self.wait_timeout)
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the identical call already in flight.
+
+        The first caller for a key runs fn; callers arriving with the same key
+        while it runs block on its result instead of repeating the work.
+
+        Args:
+            key: Identifies equivalent requests
+            fn: Zero-argument callable doing the actual work
+
+        Returns:
+            The result of fn, shared by every caller with the same key
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller
+            TimeoutError: A waiting caller outlived wait_timeout
+        """
+        future, is_leader = self.claim(key)
+        if not is_leader:
+            return self.wait(future)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.settle(key, error=e)
+            raise
+        self.settle(key, result=result)
+        return result
@@ -0,0 +1,120 @@
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class SemanticCache:
+    """Caches answers to past questions, matched by embedding similarity"""
+
+    COLLECTION_NAME = "response_cache"
+
+    def __init__(
+        self,
+        client,
+        embedding_function: Callable[[List[str]], Any],
+        threshold: float = 0.95,
+        ttl_seconds: int = 3600,
+        max_entries: int = 500,
+        collection_name: str = COLLECTION_NAME,
+    ):
+        self.embedding_function = embedding_function
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Embeddings are always supplied by us, so the collection needs no
+        # embedding function of its own; cosine space makes distance = 1 - sim
+        self.collection = client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=None,
+            metadata={"hnsw:space": "cosine"},
+        )
+
+    def embed(self, query: str) -> List[float]:
+        """Embed a query once so lookup and store can share the vector"""
+        return [float(x) for x in self.embedding_function([query])[0]]
+
+    def lookup(
+        self, embedding: List[float]
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            embedding: Embedding of the incoming query
+
+        Returns:
+            Tuple of (response, sources) on a fresh hit, otherwise None
+        """
+        try:
+            if self.collection.count() == 0:
+                return None
+
+            results = self.collection.query(
+                query_embeddings=[embedding],
+                n_results=1,
+                include=["metadatas", "distances"],
+            )
+            if not results["ids"][0]:
+                return None
+
+            entry_id = results["ids"][0][0]
+            metadata = results["metadatas"][0][0]
+            similarity = 1.0 - results["distances"][0][0]
+            if similarity < self.threshold:
+                return None
+
+            if time.time() - metadata["ts"] > self.ttl_seconds:
+                self.collection.delete(ids=[entry_id])
+                return None
+
+            return metadata["response"], json.loads(metadata["sources_json"])
+        except Exception as e:
+            print(f"Error reading response cache: {e}")
+            return None
+
+    def add(
+        self,
+        embedding: List[float],
+        query: str,
+        response: str,
+        sources: List[Dict[str, Any]],
+    ):
+        """Store an answer and evict the oldest entries beyond max_entries"""
+        try:
+            self.collection.add(
+                ids=[str(uuid.uuid4())],
+                embeddings=[embedding],
+                documents=[query],
+                metadatas=[
+                    {
+                        "response": response,
+                        "sources_json": json.dumps(sources),
+                        "ts": time.time(),
+                    }
+                ],
+            )
+            self._evict()
+        except Exception as e:
+            print(f"Error writing response cache: {e}")
+
+    def _evict(self):
+        """Drop the oldest entries once the cache grows past max_entries"""
+        overflow = self.collection.count() - self.max_entries
+        if overflow <= 0:
+            return
+
+        entries = self.collection.get(include=["metadatas"])
+        by_age = sorted(
+            zip(entries["ids"], entries["metadatas"]), key=lambda item: item[1]["ts"]
+        )
+        self.collection.delete(ids=[entry_id for entry_id, _ in by_age[:overflow]])
+
+    def clear(self):
+        """Remove all cached answers"""
+        try:
+            entries = self.collection.get(include=[])
+            if entries["ids"]:
+                self.collection.delete(ids=entries["ids"])
+        except Exception as e:
+            print(f"Error clearing response cache: {e}")
@@ -1,3 +1,4 @@
+import copy
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Protocol
 
@@ -277,6 +278,7 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._tool_definitions: Optional[List[Dict[str, Any]]] = None
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -285,10 +287,49 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._tool_definitions = None
 
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        # Definitions are static per tool, so build them once per tool set
+        if self._tool_definitions is None:
+            self._tool_definitions = [
+                tool.get_tool_definition() for tool in self.tools.values()
+            ]
+        return self._tool_definitions
+
+    def for_request(self) -> "ToolManager":
+        """
+        Return a manager over fresh copies of the registered tools.
+
+        Tools record the sources of their last search on the instance, so each
+        query works on its own copies and concurrent queries never see or
+        reset each other's sources. The copies share the vector store.
+        """
+        scoped = ToolManager()
+        for tool_name, tool in self.tools.items():
+            tool_copy = copy.copy(tool)
+            if hasattr(tool_copy, "last_sources"):
+                tool_copy.last_sources = []
+            scoped.tools[tool_name] = tool_copy
+        scoped._tool_definitions = self.get_tool_definitions()
+        return scoped
+
+    def merge_sources(self, managers: List["ToolManager"]):
+        """
+        Take over the sources found by per-call managers from for_request().
+
+        Each tool that found sources in any of the managers ends up with all
+        of them, in the order the managers are given; other tools keep theirs.
+        """
+        merged: Dict[str, List] = {}
+        for manager in managers:
+            for tool_name, tool in manager.tools.items():
+                if getattr(tool, "last_sources", None):
+                    merged.setdefault(tool_name, []).extend(tool.last_sources)
+
+        for tool_name, sources in merged.items():
+            self.tools[tool_name].last_sources = sources
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
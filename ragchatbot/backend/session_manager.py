@@ -1,3 +1,4 @@
+import threading
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
@@ -17,12 +18,14 @@ class SessionManager:
         self.max_history = max_history
         self.sessions: Dict[str, List[Message]] = {}
         self.session_counter = 0
+        self._lock = threading.Lock()  # Requests are served from a threadpool
 
     def create_session(self) -> str:
         """Create a new conversation session"""
-        self.session_counter += 1
-        session_id = f"session_{self.session_counter}"
-        self.sessions[session_id] = []
+        with self._lock:
+            self.session_counter += 1
+            session_id = f"session_{self.session_counter}"
+            self.sessions[session_id] = []
         return session_id
 
     def add_message(self, session_id: str, role: str, content: str):
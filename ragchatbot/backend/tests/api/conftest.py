@@ -0,0 +1,216 @@
+"""Fixtures for the API endpoint tests"""
+
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def _shared_rag_system():
+    """Single mock RAG system reused by every API test"""
+    mock_rag = Mock()
+    mock_rag.session_manager = Mock()
+    return mock_rag
+
+
+@pytest.fixture
+def mock_rag_system(_shared_rag_system):
+    """Reset the shared mock RAG system to its default API-test behaviour"""
+    mock_rag = _shared_rag_system
+    # Drops call history plus any return values or side effects a test set
+    mock_rag.reset_mock(return_value=True, side_effect=True)
+
+    mock_rag.query.return_value = (
+        "This is a test answer from the RAG system.",
+        [
+            {"text": "Sample content from course", "link": "https://example.com/lesson1"},
+            {"text": "Additional relevant content", "link": "https://example.com/lesson2"}
+        ]
+    )
+    mock_rag.query_stream.side_effect = lambda query, session_id: iter([
+        {"type": "delta", "text": "This is a test "},
+        {"type": "delta", "text": "answer from the RAG system."},
+        {"type": "done", "sources": mock_rag.query.return_value[1]},
+    ])
+    mock_rag.get_course_analytics.return_value = {
+        "total_courses": 2,
+        "course_titles": ["Test Course 1", "Test Course 2"]
+    }
+    
+    # Mock session manager
+    mock_rag.session_manager.create_session.return_value = "test-session-123"
+    mock_rag.session_manager.clear_session.return_value = None
+    
+    return mock_rag
+
+
+@pytest.fixture(scope="session")
+def _app_template():
+    """Build the test FastAPI app once; handlers read the RAG system from app.state"""
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.middleware.trustedhost import TrustedHostMiddleware
+    from pydantic import BaseModel
+    from typing import List, Optional, Dict, Any
+    
+    # Create test app without static file mounting to avoid import issues
+    app = FastAPI(title="Test Course Materials RAG System")
+    
+    # Add middleware
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+    
+    # Define models inline to avoid import issues
+    class QueryRequest(BaseModel):
+        query: str
+        session_id: Optional[str] = None
+
+    class QueryResponse(BaseModel):
+        answer: str
+        sources: List[Dict[str, Any]]
+        session_id: str
+
+    class CourseStats(BaseModel):
+        total_courses: int
+        course_titles: List[str]
+
+    class NewSessionRequest(BaseModel):
+        old_session_id: Optional[str] = None
+
+    class NewSessionResponse(BaseModel):
+        session_id: str
+        message: str
+    
+    # Define API endpoints inline using the mock
+    @app.post("/api/query", response_model=QueryResponse)
+    def query_documents(request: QueryRequest):
+        try:
+            session_id = request.session_id
+            if not session_id:
+                session_id = app.state.rag.session_manager.create_session()
+            
+            answer, sources = app.state.rag.query(request.query, session_id)
+            return QueryResponse(answer=answer, sources=sources, session_id=session_id)
+        except Exception as e:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/api/query/stream")
+    def stream_query(request: QueryRequest):
+        import json
+        from fastapi.responses import StreamingResponse
+
+        session_id = request.session_id
+        if not session_id:
+            session_id = app.state.rag.session_manager.create_session()
+
+        def event_stream():
+            try:
+                for event in app.state.rag.query_stream(request.query, session_id):
+                    if event["type"] == "done":
+                        event = {**event, "session_id": session_id}
+                    yield f"data: {json.dumps(event)}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.get("/api/courses", response_model=CourseStats)
+    def get_course_stats():
+        try:
+            analytics = app.state.rag.get_course_analytics()
+            return CourseStats(
+                total_courses=analytics["total_courses"],
+                course_titles=analytics["course_titles"]
+            )
+        except Exception as e:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/api/new-session", response_model=NewSessionResponse)
+    def start_new_session(request: NewSessionRequest):
+        try:
+            if request.old_session_id:
+                app.state.rag.session_manager.clear_session(request.old_session_id)
+            
+            new_session_id = app.state.rag.session_manager.create_session()
+            return NewSessionResponse(
+                session_id=new_session_id,
+                message="New chat session started successfully"
+            )
+        except Exception as e:
+            from fastapi import HTTPException
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.get("/")
+    async def root():
+        return {"message": "Course Materials RAG System API"}
+    
+    return app
+
+
+@pytest.fixture(scope="session")
+def _session_client(_app_template):
+    """Single TestClient shared by every API test"""
+    return TestClient(_app_template)
+
+
+@pytest.fixture
+def test_app(_app_template, mock_rag_system):
+    """Point the shared test app at this test's mock RAG system"""
+    _app_template.state.rag = mock_rag_system
+    yield _app_template
+    del _app_template.state.rag
+
+
+@pytest.fixture
+def client(test_app, _session_client):
+    """Create a test client for the FastAPI app"""
+    return _session_client
+
+
+@pytest.fixture
+def sample_query_request():
+    """Sample query request for API testing"""
+    return {
+        "query": "What are the main topics covered in the course?",
+        "session_id": "test-session-123"
+    }
+
+
+@pytest.fixture
+def sample_new_session_request():
+    """Sample new session request for API testing"""
+    return {
+        "old_session_id": "old-session-456"
+    }
+
+
+@pytest.fixture
+def expected_query_response():
+    """Expected query response for API testing"""
+    return {
+        "answer": "This is a test answer from the RAG system.",
+        "sources": [
+            {"text": "Sample content from course", "link": "https://example.com/lesson1"},
+            {"text": "Additional relevant content", "link": "https://example.com/lesson2"}
+        ],
+        "session_id": "test-session-123"
+    }
+
+
+@pytest.fixture
+def expected_course_stats():
+    """Expected course statistics for API testing"""
+    return {
+        "total_courses": 2,
+        "course_titles": ["Test Course 1", "Test Course 2"]
+    }
@@ -3,6 +3,7 @@ API endpoint tests for the FastAPI application.
 
 These tests verify the behavior of all API endpoints including:
 - /api/query - Process queries and return responses with sources
+- /api/query/stream - Stream answers as server-sent events
 - /api/courses - Get course statistics and analytics
 - /api/new-session - Start new conversation sessions
 - / - Root endpoint
@@ -82,6 +83,54 @@ class TestQueryEndpoint:
         assert "RAG system error" in response.json()["detail"]
 
 
+def parse_sse(body):
+    """Decode a text/event-stream body into its JSON events"""
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+@pytest.mark.api
+class TestQueryStreamEndpoint:
+    """Test cases for the /api/query/stream endpoint"""
+
+    def test_stream_emits_deltas_then_done(self, client, sample_query_request, expected_query_response):
+        """Test that the answer arrives as deltas followed by sources"""
+        response = client.post("/api/query/stream", json=sample_query_request)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_sse(response.text)
+        deltas = [event["text"] for event in events if event["type"] == "delta"]
+        assert "".join(deltas) == expected_query_response["answer"]
+        assert events[-1] == {
+            "type": "done",
+            "sources": expected_query_response["sources"],
+            "session_id": "test-session-123",
+        }
+
+    def test_stream_without_session_id(self, client, mock_rag_system):
+        """Test that streaming creates a session when none is given"""
+        response = client.post("/api/query/stream", json={"query": "What is RAG?"})
+
+        mock_rag_system.session_manager.create_session.assert_called()
+        assert parse_sse(response.text)[-1]["session_id"] == "test-session-123"
+
+    def test_stream_reports_errors_in_band(self, client, mock_rag_system):
+        """Test that a failure mid-stream is sent as an error event"""
+        mock_rag_system.query_stream.side_effect = Exception("RAG system error")
+
+        response = client.post("/api/query/stream", json={"query": "test"})
+
+        assert response.status_code == 200
+        assert parse_sse(response.text) == [
+            {"type": "error", "detail": "RAG system error"}
+        ]
+
+
 @pytest.mark.api
 class TestCoursesEndpoint:
     """Test cases for the /api/courses endpoint"""
@@ -203,61 +252,34 @@ class TestMiddleware:
 class TestResponseValidation:
     """Test cases for response model validation"""
     
-    def test_query_response_schema(self, client, sample_query_request):
-        """Test query response follows correct schema"""
-        response = client.post("/api/query", json=sample_query_request)
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        # Check required fields
-        required_fields = ["answer", "sources", "session_id"]
-        for field in required_fields:
-            assert field in data
-        
-        # Check types
-        assert isinstance(data["answer"], str)
-        assert isinstance(data["sources"], list)
-        assert isinstance(data["session_id"], str)
-        
-        # Check sources structure
-        for source in data["sources"]:
-            assert isinstance(source, dict)
-            assert "text" in source
-            assert "link" in source
-    
-    def test_course_stats_response_schema(self, client):
-        """Test course stats response follows correct schema"""
-        response = client.get("/api/courses")
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        # Check required fields
-        required_fields = ["total_courses", "course_titles"]
-        for field in required_fields:
-            assert field in data
-        
-        # Check types
-        assert isinstance(data["total_courses"], int)
-        assert isinstance(data["course_titles"], list)
-        assert all(isinstance(title, str) for title in data["course_titles"])
-    
-    def test_new_session_response_schema(self, client):
-        """Test new session response follows correct schema"""
-        response = client.post("/api/new-session", json={})
+    @pytest.mark.parametrize("method,path,body,schema,item_types", [
+        (
+            "POST", "/api/query", {"query": "What is covered?", "session_id": "test-session-123"},
+            {"answer": str, "sources": list, "session_id": str}, {"sources": dict},
+        ),
+        (
+            "GET", "/api/courses", None,
+            {"total_courses": int, "course_titles": list}, {"course_titles": str},
+        ),
+        (
+            "POST", "/api/new-session", {},
+            {"session_id": str, "message": str}, {},
+        ),
+    ], ids=["query", "courses", "new-session"])
+    def test_response_schema(self, client, method, path, body, schema, item_types):
+        """Test each endpoint's response has the required fields and types"""
+        response = client.request(method, path, json=body)
         
         assert response.status_code == 200
         data = response.json()
         
-        # Check required fields
-        required_fields = ["session_id", "message"]
-        for field in required_fields:
-            assert field in data
+        # Check required fields and their types
+        for field, field_type in schema.items():
+            assert isinstance(data[field], field_type), field
         
-        # Check types
-        assert isinstance(data["session_id"], str)
-        assert isinstance(data["message"], str)
+        # Check list elements
+        for field, item_type in item_types.items():
+            assert all(isinstance(item, item_type) for item in data[field]), field
 
 
 @pytest.mark.api
@@ -0,0 +1,29 @@
+"""
+Deterministic embedder for tests that run a real ChromaDB store.
+
+Kept apart from fakes.py because it subclasses a chromadb type, and the fakes
+are also imported by tests that must not load chromadb.
+"""
+
+import hashlib
+from typing import Any, List
+
+from chromadb.api.types import Documents, EmbeddingFunction
+
+
+class FakeEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic hash-based embedder standing in for SentenceTransformer"""
+
+    def __init__(self, model_name: str = "fake", **kwargs: Any):
+        self.model_name = model_name
+
+    def __call__(self, input: Documents) -> List[List[float]]:
+        # 32 dimensions from the text's digest; no model weights, no torch
+        return [
+            [byte / 255 for byte in hashlib.sha256(text.encode()).digest()]
+            for text in input
+        ]
+
+    @staticmethod
+    def name() -> str:
+        return "fake_hash"
@@ -0,0 +1,96 @@
+"""
+Lightweight stand-ins for Anthropic response objects and the vector store.
+
+Frozen, slotted dataclasses give fixed attribute access without Mock's
+per-attribute child creation, and they fail loudly on typos instead of
+silently returning a new Mock.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    # Annotations only, so importing the fakes does not load vector_store
+    from vector_store import SearchResults
+
+
+@dataclass(frozen=True, slots=True)
+class FakeTextBlock:
+    """A text content block"""
+
+    text: str
+    type: str = "text"
+
+
+@dataclass(frozen=True, slots=True)
+class FakeToolUseBlock:
+    """A tool_use content block"""
+
+    id: str
+    name: str
+    input: Dict[str, Any]
+    type: str = "tool_use"
+
+
+@dataclass(frozen=True, slots=True)
+class FakeMessage:
+    """A Messages API response"""
+
+    content: Tuple[Union[FakeTextBlock, FakeToolUseBlock], ...]
+    stop_reason: str = "end_turn"
+
+
+def text_response(text: str) -> FakeMessage:
+    """Build a response that ends the turn with a single text block"""
+    return FakeMessage(content=(FakeTextBlock(text),))
+
+
+def tool_block(name: str, input: Dict[str, Any], id: str) -> FakeToolUseBlock:
+    """Build a tool_use block"""
+    return FakeToolUseBlock(id=id, name=name, input=input)
+
+
+def tool_use_response(*blocks: FakeToolUseBlock) -> FakeMessage:
+    """Build a response that asks for the given tool calls"""
+    return FakeMessage(content=tuple(blocks), stop_reason="tool_use")
+
+
+class FakeVectorStore:
+    """Canned VectorStore for the search tools that records what they ask for"""
+
+    def __init__(
+        self,
+        search_results: "SearchResults",
+        lesson_link: Optional[str] = None,
+        courses_metadata: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.search_results = search_results
+        self.lesson_link = lesson_link
+        self.courses_metadata = courses_metadata or []
+        # Raised instead of returning, when set
+        self.lesson_link_error: Optional[Exception] = None
+        self.metadata_error: Optional[Exception] = None
+
+        self.search_calls: List[Tuple[str, Optional[str], Optional[int]]] = []
+        self.lesson_link_calls: List[Tuple[str, int]] = []
+
+    def search(
+        self,
+        query: str,
+        course_name: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> "SearchResults":
+        self.search_calls.append((query, course_name, lesson_number))
+        return self.search_results
+
+    def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
+        self.lesson_link_calls.append((course_title, lesson_number))
+        if self.lesson_link_error:
+            raise self.lesson_link_error
+        return self.lesson_link
+
+    def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
+        if self.metadata_error:
+            raise self.metadata_error
+        return self.courses_metadata
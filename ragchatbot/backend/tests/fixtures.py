@@ -0,0 +1,251 @@
+"""Fixtures shared by every backend test module"""
+
+import uuid
+from functools import lru_cache
+from unittest.mock import MagicMock, patch
+
+import anthropic
+import pytest
+from config import Config
+from models import Course, CourseChunk, Lesson
+
+# ChromaDB paths with this prefix name an in-memory database, not a directory
+MEMORY_CHROMA_PREFIX = "mem://"
+
+
+@pytest.fixture(scope="session")
+def in_memory_chroma():
+    """Serve mem:// ChromaDB paths from in-memory databases for the session"""
+    import chromadb
+    from chromadb.errors import NotFoundError
+
+    admin = chromadb.AdminClient()
+    persistent_client = chromadb.PersistentClient
+
+    def client_for(path, *args, **kwargs):
+        if not path.startswith(MEMORY_CHROMA_PREFIX):
+            return persistent_client(path, *args, **kwargs)
+
+        # Every ephemeral client shares one in-process system, so each path
+        # gets its own database to keep stores apart
+        database = path.removeprefix(MEMORY_CHROMA_PREFIX)
+        try:
+            admin.get_database(database)
+        except NotFoundError:
+            admin.create_database(database)
+        return chromadb.EphemeralClient(database=database)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(chromadb, "PersistentClient", client_for)
+        yield admin
+
+
+@pytest.fixture(scope="session")
+def temp_chroma_path(in_memory_chroma):
+    """In-memory ChromaDB path shared by the whole test session"""
+    yield f"{MEMORY_CHROMA_PREFIX}session"
+    in_memory_chroma.delete_database("session")
+
+
+@pytest.fixture
+def isolated_chroma_path(in_memory_chroma):
+    """Fresh in-memory ChromaDB path for tests that write to a real store"""
+    database = f"test_{uuid.uuid4().hex}"
+    yield f"{MEMORY_CHROMA_PREFIX}{database}"
+    in_memory_chroma.delete_database(database)
+
+
+@pytest.fixture(scope="session")
+def cached_embedding_function():
+    """Build each SentenceTransformer embedding function once per session"""
+    from chromadb.utils import embedding_functions
+
+    # Failed loads are not cached, so bad model names still raise every time
+    factory = lru_cache(maxsize=4)(
+        embedding_functions.SentenceTransformerEmbeddingFunction
+    )
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(embedding_functions, "SentenceTransformerEmbeddingFunction", factory)
+        yield factory
+
+
+@pytest.fixture
+def test_config(temp_chroma_path):
+    """Create a test configuration"""
+    config = Config()
+    config.ANTHROPIC_API_KEY = "test-api-key"
+    config.CHROMA_PATH = temp_chroma_path
+    config.MAX_RESULTS = 3
+    return config
+
+
+@pytest.fixture
+def sample_course():
+    """Create a sample course for testing"""
+    lessons = [
+        Lesson(
+            lesson_number=1,
+            title="Introduction",
+            lesson_link="https://example.com/lesson1",
+        ),
+        Lesson(
+            lesson_number=2,
+            title="Advanced Topics",
+            lesson_link="https://example.com/lesson2",
+        ),
+    ]
+    return Course(
+        title="Sample Course",
+        course_link="https://example.com/course",
+        instructor="Test Instructor",
+        lessons=lessons,
+    )
+
+
+@pytest.fixture
+def sample_course_chunks():
+    """Create sample course chunks for testing"""
+    return [
+        CourseChunk(
+            content="This is the introduction to our sample course. We will cover basic concepts.",
+            course_title="Sample Course",
+            lesson_number=1,
+            chunk_index=0,
+        ),
+        CourseChunk(
+            content="In this lesson, we dive deeper into advanced topics and practical applications.",
+            course_title="Sample Course",
+            lesson_number=2,
+            chunk_index=1,
+        ),
+        CourseChunk(
+            content="Here are some examples and case studies to illustrate the concepts.",
+            course_title="Sample Course",
+            lesson_number=2,
+            chunk_index=2,
+        ),
+    ]
+
+
+@pytest.fixture(scope="session")
+def large_course_bundle():
+    """A 100-lesson course and its 1000 chunks, built once per session"""
+    course = Course(
+        title="Large Course",
+        course_link="https://example.com",
+        instructor="Test Instructor",
+        lessons=[
+            Lesson(
+                lesson_number=i,
+                title=f"Lesson {i}",
+                lesson_link=f"https://example.com/lesson{i}",
+            )
+            for i in range(1, 101)
+        ],
+    )
+    chunks = [
+        CourseChunk(
+            content=f"Content for chunk {i} with detailed information about topic {i}.",
+            course_title="Large Course",
+            lesson_number=(i % 10) + 1,
+            chunk_index=i,
+        )
+        for i in range(1000)
+    ]
+    return course, chunks
+
+
+@pytest.fixture
+def mock_search_results():
+    """Create mock search results for testing"""
+    from vector_store import SearchResults
+
+    return SearchResults(
+        documents=[
+            "This is the introduction to our sample course. We will cover basic concepts.",
+            "In this lesson, we dive deeper into advanced topics and practical applications.",
+        ],
+        metadata=[
+            {"course_title": "Sample Course", "lesson_number": 1, "chunk_index": 0},
+            {"course_title": "Sample Course", "lesson_number": 2, "chunk_index": 1},
+        ],
+        distances=[0.1, 0.2],
+    )
+
+
+@pytest.fixture
+def empty_search_results():
+    """Create empty search results for testing"""
+    from vector_store import SearchResults
+
+    return SearchResults(documents=[], metadata=[], distances=[])
+
+
+@pytest.fixture
+def error_search_results():
+    """Create error search results for testing"""
+    from vector_store import SearchResults
+
+    return SearchResults.empty("Vector store connection failed")
+
+
+@pytest.fixture
+def fake_vector_store():
+    """Create a fake vector store for testing"""
+    from vector_store import SearchResults
+
+    from .fakes import FakeVectorStore
+
+    return FakeVectorStore(
+        SearchResults(
+            documents=["Sample content"],
+            metadata=[{"course_title": "Test Course", "lesson_number": 1}],
+            distances=[0.1],
+        ),
+        lesson_link="https://example.com/lesson1",
+    )
+
+
+# Captured before any test patches it, so spec'd mocks always see the real SDK
+_REAL_ANTHROPIC = anthropic.Anthropic
+
+
+@pytest.fixture(scope="class")
+def anthropic_factory():
+    """Patch ai_generator's Anthropic class once per test class"""
+    import ai_generator
+
+    # Falls through to the real client until a test installs its own mock
+    with patch.object(
+        ai_generator.anthropic, "Anthropic", side_effect=_REAL_ANTHROPIC
+    ) as factory:
+        yield factory
+
+
+@pytest.fixture
+def mock_anthropic(anthropic_factory):
+    """Route every anthropic.Anthropic() built by ai_generator to one mock client"""
+    # Spec'd mocks only grow real SDK attributes, so typos fail loudly
+    client = MagicMock(spec=_REAL_ANTHROPIC)
+    client.messages = MagicMock(spec=anthropic.resources.Messages)
+
+    anthropic_factory.reset_mock()
+    anthropic_factory.side_effect = None
+    anthropic_factory.return_value = client
+    yield client
+    anthropic_factory.side_effect = _REAL_ANTHROPIC
+
+
+@pytest.fixture(scope="module")
+def shared_generator():
+    """Build one AIGenerator per test module; tests swap in their own client"""
+    from ai_generator import AIGenerator
+
+    return AIGenerator("test-api-key", "claude-sonnet-4-20250514", client=MagicMock())
+
+
+@pytest.fixture
+def generator(shared_generator, mock_anthropic):
+    """Shared AIGenerator wired to this test's mock Anthropic client"""
+    shared_generator.client = mock_anthropic
+    return shared_generator
@@ -9,9 +9,6 @@ import subprocess
 import sys
 from datetime import datetime
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 
 def run_pytest_with_output():
     """Run pytest and capture detailed output"""
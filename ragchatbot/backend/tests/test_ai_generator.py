@@ -1,14 +1,53 @@
-import os
-import sys
+import re
+import threading
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from ai_generator import AIGenerator
-from search_tools import CourseSearchTool, ToolManager
+from ai_generator import (
+    _REQUEST_TIMEOUT,
+    STREAM_RESET,
+    AIGenerator,
+    GenerationError,
+)
+
+from .fakes import (
+    FakeMessage,
+    FakeTextBlock,
+    text_response,
+    tool_block,
+    tool_use_response,
+)
+
+pytestmark = pytest.mark.unit
+
+# Guidance the system prompt must keep, matched in a single pass
+_PROMPT_NEEDLES = (
+    "course materials",
+    "Content Search Tool",
+    "Course Outline Tool",
+    "Multi-Step Search Protocol",
+)
+_NEEDLE_RE = re.compile("|".join(map(re.escape, _PROMPT_NEEDLES)))
+
+MODEL = "claude-sonnet-4-20250514"
+
+# Tool definitions and inputs shared by the tests; nothing below mutates them
+SEARCH_TOOL = {"name": "search_course_content", "description": "Search courses"}
+TOOLS_SEARCH = [SEARCH_TOOL]
+TOOLS_BOTH = [{"name": "search_course_content"}, {"name": "get_course_outline"}]
+QUERY_INPUT = {"query": "test search"}
+
+
+def mock_stream(texts, stop_reason="end_turn", content=None):
+    """Build a messages.stream() context manager yielding the given text"""
+    final_message = FakeMessage(
+        content=content or (FakeTextBlock("".join(texts)),), stop_reason=stop_reason
+    )
+
+    stream = MagicMock()
+    stream.__enter__.return_value.text_stream = iter(texts)
+    stream.__enter__.return_value.get_final_message.return_value = final_message
+    return stream
 
 
 class TestAIGenerator:
@@ -16,110 +55,159 @@ class TestAIGenerator:
 
     def test_init_with_valid_credentials(self):
         """Test AIGenerator initialization with valid credentials"""
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        generator = AIGenerator("test-api-key", MODEL)
 
-        assert generator.model == "claude-sonnet-4-20250514"
-        assert generator.base_params["model"] == "claude-sonnet-4-20250514"
+        assert generator.model == MODEL
+        assert generator.base_params["model"] == MODEL
         assert generator.base_params["temperature"] == 0
         assert generator.base_params["max_tokens"] == 800
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_without_tools(self, mock_anthropic):
+    def test_client_uses_http2_and_request_timeout(self):
+        """Test that the client shares one HTTP/2 pool with a bounded timeout"""
+        with patch("anthropic.DefaultHttpxClient") as http_client_cls, patch(
+            "anthropic.Anthropic"
+        ) as client_cls:
+            generator = AIGenerator("test-api-key", MODEL)
+
+        http_client_cls.assert_called_once_with(http2=True)
+        client_cls.assert_called_once_with(
+            api_key="test-api-key",
+            timeout=_REQUEST_TIMEOUT,
+            http_client=http_client_cls.return_value,
+        )
+        assert generator.client is client_cls.return_value
+        assert _REQUEST_TIMEOUT.connect == 5.0
+        assert _REQUEST_TIMEOUT.read == 60.0
+
+    def test_injected_client_is_used_as_is(self):
+        """Test that a caller-supplied client replaces the default one"""
+        client = MagicMock()
+
+        generator = AIGenerator("test-api-key", MODEL, client=client)
+
+        assert generator.client is client
+
+    def test_generate_response_without_tools(self, mock_anthropic, generator):
         """Test response generation without tools"""
         # Mock the response
-        mock_response = Mock()
-        mock_response.content = [Mock(text="This is a direct response.")]
-        mock_response.stop_reason = "end_turn"
+        mock_response = text_response("This is a direct response.")
 
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
+        mock_anthropic.messages.create.return_value = mock_response
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
         result = generator.generate_response("What is AI?")
 
         assert result == "This is a direct response."
-        mock_client.messages.create.assert_called_once()
+        mock_anthropic.messages.create.assert_called_once()
+
+    def test_generate_response_max_tokens_override(self, mock_anthropic, generator):
+        """Test that a per-call max_tokens reaches every API call"""
+        mock_anthropic.messages.create.side_effect = (
+            tool_use_response(
+                tool_block("search_course_content", {"query": "MCP"}, "tool_1")
+            ),
+            text_response("Answer."),
+        )
+
+        generator.generate_response(
+            "Outline the MCP course",
+            tools=TOOLS_SEARCH,
+            tool_manager=Mock(),
+            max_tokens=400,
+        )
+
+        for call in mock_anthropic.messages.create.call_args_list:
+            assert call[1]["max_tokens"] == 400
+        assert generator.base_params["max_tokens"] == 800
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_with_conversation_history(self, mock_anthropic):
+    def test_generate_response_with_conversation_history(
+        self, mock_anthropic, generator
+    ):
         """Test response generation with conversation history"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Response with context.")]
-        mock_response.stop_reason = "end_turn"
+        mock_response = text_response("Response with context.")
 
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
+        mock_anthropic.messages.create.return_value = mock_response
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
         history = "User: Previous question\nAssistant: Previous answer"
 
         result = generator.generate_response(
             "Follow-up question", conversation_history=history
         )
 
-        # Verify history was included in system prompt
-        call_args = mock_client.messages.create.call_args
-        system_content = call_args[1]["system"]
-        assert "Previous conversation:" in system_content
-        assert history in system_content
+        # Verify history was appended after the static system prompt
+        call_args = mock_anthropic.messages.create.call_args
+        system_blocks = call_args[1]["system"]
+        assert len(system_blocks) == 2
+        assert system_blocks[0]["text"] == generator.SYSTEM_PROMPT
+        assert "Previous conversation:" in system_blocks[1]["text"]
+        assert history in system_blocks[1]["text"]
+
+    def test_system_prompt_sent_without_cache_breakpoint(
+        self, mock_anthropic, generator
+    ):
+        """Test that the static prompt, too short to cache, has no breakpoint"""
+        mock_response = text_response("Response.")
+
+        mock_anthropic.messages.create.return_value = mock_response
+
+        generator.generate_response("What is AI?")
+
+        system_blocks = mock_anthropic.messages.create.call_args[1]["system"]
+        assert system_blocks == [
+            {
+                "type": "text",
+                "text": generator.SYSTEM_PROMPT,
+            }
+        ]
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_with_tools_no_tool_use(self, mock_anthropic):
-        """Test response generation with tools available but no tool use"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Direct answer without using tools.")]
-        mock_response.stop_reason = "end_turn"
+    def test_system_prompt_block_shared_across_calls(self, mock_anthropic, generator):
+        """Test that every request reuses the same prebuilt prompt block"""
+        mock_response = text_response("Response.")
 
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
+        mock_anthropic.messages.create.return_value = mock_response
+
+        generator.generate_response("What is AI?")
+        generator.generate_response("What is ML?", conversation_history="User: hi")
+
+        first, second = mock_anthropic.messages.create.call_args_list
+        assert first[1]["system"][0] is second[1]["system"][0]
+
+    def test_generate_response_with_tools_no_tool_use(self, mock_anthropic, generator):
+        """Test response generation with tools available but no tool use"""
+        mock_response = text_response("Direct answer without using tools.")
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        mock_anthropic.messages.create.return_value = mock_response
 
         # Mock tool definitions
-        tools = [{"name": "search_course_content", "description": "Search courses"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response("General question", tools=tools)
 
         assert result == "Direct answer without using tools."
 
         # Verify tools were passed to API
-        call_args = mock_client.messages.create.call_args
+        call_args = mock_anthropic.messages.create.call_args
         assert "tools" in call_args[1]
         assert call_args[1]["tools"] == tools
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_with_tool_use(self, mock_anthropic):
+    def test_generate_response_with_tool_use(self, mock_anthropic, generator):
         """Test response generation that uses tools"""
         # First response - tool use
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test search"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_block = tool_block("search_course_content", QUERY_INPUT, "tool_123")
+        mock_tool_response = tool_use_response(mock_tool_block)
 
         # Second response - final answer
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Answer based on search results.")]
+        mock_final_response = text_response("Answer based on search results.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_tool_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         # Mock tool manager
         mock_tool_manager = Mock()
         mock_tool_manager.execute_tool.return_value = "Search results here"
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content", "description": "Search courses"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response(
             "Search for AI content", tools=tools, tool_manager=mock_tool_manager
@@ -128,43 +216,39 @@ class TestAIGenerator:
         assert result == "Answer based on search results."
 
         # Verify tool was executed
-        mock_tool_manager.execute_tool.assert_called_once_with(
-            "search_course_content", query="test search"
-        )
+        assert mock_tool_manager.execute_tool.call_count == 1
+        args, kwargs = mock_tool_manager.execute_tool.call_args
+        assert args == ("search_course_content",) and kwargs == QUERY_INPUT
 
         # Verify two API calls were made
-        assert mock_client.messages.create.call_count == 2
+        assert mock_anthropic.messages.create.call_count == 2
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_tool_execution_error(self, mock_anthropic):
+        # Second call carries: user query, assistant tool use, user tool results
+        second_call = mock_anthropic.messages.create.call_args_list[1]
+        messages = second_call[1]["messages"]
+        assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+
+    def test_generate_response_tool_execution_error(self, mock_anthropic, generator):
         """Test handling of tool execution errors"""
         # Mock tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_block = tool_block(
+            "search_course_content", {"query": "test"}, "tool_123"
+        )
+        mock_tool_response = tool_use_response(mock_tool_block)
 
         # Mock final response
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Handled error gracefully.")]
+        mock_final_response = text_response("Handled error gracefully.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_tool_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         # Mock tool manager that raises error
         mock_tool_manager = Mock()
         mock_tool_manager.execute_tool.return_value = "Tool execution failed"
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response(
             "Search query", tools=tools, tool_manager=mock_tool_manager
@@ -172,81 +256,55 @@ class TestAIGenerator:
 
         assert result == "Handled error gracefully."
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_api_error_handling(self, mock_anthropic):
-        """Test handling of Anthropic API errors"""
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = Exception(
-            "API Error: Rate limit exceeded"
-        )
-        mock_anthropic.return_value = mock_client
+    @pytest.mark.parametrize(
+        "api_key,exc_msg",
+        [
+            ("test-api-key", "API Error: Rate limit exceeded"),
+            ("invalid-key", "Invalid API key"),
+        ],
+    )
+    def test_api_errors_propagate(self, mock_anthropic, api_key, exc_msg):
+        """Test that Anthropic API errors reach the caller unchanged"""
+        mock_anthropic.messages.create.side_effect = Exception(exc_msg)
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
+        generator = AIGenerator(api_key, MODEL, client=mock_anthropic)
 
-        with pytest.raises(Exception) as exc_info:
+        with pytest.raises(Exception, match=exc_msg):
             generator.generate_response("Test query")
 
-        assert "API Error: Rate limit exceeded" in str(exc_info.value)
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_invalid_api_key_handling(self, mock_anthropic):
-        """Test handling of invalid API key"""
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = Exception("Invalid API key")
-        mock_anthropic.return_value = mock_client
-
-        generator = AIGenerator("invalid-key", "claude-sonnet-4-20250514")
-
-        with pytest.raises(Exception) as exc_info:
-            generator.generate_response("Test query")
-
-        assert "Invalid API key" in str(exc_info.value)
-
-    @patch("ai_generator.anthropic.Anthropic")
     def test_empty_api_key(self, mock_anthropic):
         """Test behavior with empty API key"""
-        generator = AIGenerator("", "claude-sonnet-4-20250514")
+        generator = AIGenerator("", MODEL)
         # Should initialize without error, but may fail on API call
-        assert generator.model == "claude-sonnet-4-20250514"
+        assert generator.model == MODEL
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_multiple_tool_calls(self, mock_anthropic):
+    def test_multiple_tool_calls(self, mock_anthropic, generator):
         """Test handling multiple tool calls in single response"""
         # Mock response with multiple tool calls
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-
-        tool_block1 = Mock()
-        tool_block1.type = "tool_use"
-        tool_block1.name = "search_course_content"
-        tool_block1.input = {"query": "first search"}
-        tool_block1.id = "tool_1"
+        tool_block1 = tool_block(
+            "search_course_content", {"query": "first search"}, "tool_1"
+        )
 
-        tool_block2 = Mock()
-        tool_block2.type = "tool_use"
-        tool_block2.name = "get_course_outline"
-        tool_block2.input = {"course_title": "Sample Course"}
-        tool_block2.id = "tool_2"
+        tool_block2 = tool_block(
+            "get_course_outline", {"course_title": "Sample Course"}, "tool_2"
+        )
 
-        mock_tool_response.content = [tool_block1, tool_block2]
+        mock_tool_response = tool_use_response(tool_block1, tool_block2)
 
         # Mock final response
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Combined results.")]
+        mock_final_response = text_response("Combined results.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_tool_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         # Mock tool manager
         mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = ["Search result", "Outline result"]
+        mock_tool_manager.execute_tool.side_effect = ("Search result", "Outline result")
+        mock_tool_manager.for_request.return_value = mock_tool_manager
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}, {"name": "get_course_outline"}]
+        tools = TOOLS_BOTH
 
         result = generator.generate_response(
             "Complex query", tools=tools, tool_manager=mock_tool_manager
@@ -255,118 +313,127 @@ class TestAIGenerator:
         assert result == "Combined results."
         assert mock_tool_manager.execute_tool.call_count == 2
 
-    def test_system_prompt_content(self):
-        """Test that system prompt contains expected guidance"""
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+    def test_parallel_tool_results_keep_response_order(self, mock_anthropic, generator):
+        """Test that concurrently executed tools report results in call order"""
+        mock_anthropic.messages.create.side_effect = (
+            tool_use_response(
+                tool_block("search_course_content", {"query": "slow"}, "tool_1"),
+                tool_block("search_course_content", {"query": "fast"}, "tool_2"),
+            ),
+            text_response("Answer."),
+        )
 
-        assert "course materials" in generator.SYSTEM_PROMPT
-        assert "Content Search Tool" in generator.SYSTEM_PROMPT
-        assert "Course Outline Tool" in generator.SYSTEM_PROMPT
-        assert "Multi-Step Search Protocol" in generator.SYSTEM_PROMPT
+        # "slow" finishes only after "fast", without a fixed sleep
+        fast_done = threading.Event()
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_base_params_structure(self, mock_anthropic):
-        """Test that base parameters are properly structured"""
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        def execute_tool(name, query):
+            if query == "slow":
+                fast_done.wait(timeout=1)
+            else:
+                fast_done.set()
+            return f"{query} result"
 
-        expected_params = {
-            "model": "claude-sonnet-4-20250514",
-            "temperature": 0,
-            "max_tokens": 800,
-        }
+        mock_tool_manager = Mock()
+        mock_tool_manager.execute_tool.side_effect = execute_tool
+        mock_tool_manager.for_request.return_value = mock_tool_manager
 
-        assert generator.base_params == expected_params
+        generator.generate_response(
+            "Compare",
+            tools=TOOLS_SEARCH,
+            tool_manager=mock_tool_manager,
+        )
+
+        tool_results = mock_anthropic.messages.create.call_args_list[1][1]["messages"][
+            -1
+        ]["content"]
+        assert [(r["tool_use_id"], r["content"]) for r in tool_results] == [
+            ("tool_1", "slow result"),
+            ("tool_2", "fast result"),
+        ]
+
+    def test_duplicate_tool_calls_execute_once(self, mock_anthropic, generator):
+        """Test that identical tool calls in one response share a single result"""
+        mock_tool_response = tool_use_response(
+            tool_block(
+                "search_course_content", {"query": "MCP", "lesson_number": 1}, "tool_1"
+            ),
+            tool_block(
+                "search_course_content", {"lesson_number": 1, "query": "MCP"}, "tool_2"
+            ),
+        )
+        mock_final_response = text_response("Answer.")
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_handle_tool_execution_message_building(self, mock_anthropic):
-        """Test that tool execution builds messages correctly"""
-        # This tests the _handle_tool_execution method indirectly
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer.")]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_tool_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
+        mock_tool_manager.execute_tool.return_value = "MCP lesson 1 content"
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
-        result = generator.generate_response(
-            "Test query",
-            tools=[{"name": "search_course_content"}],
+        generator.generate_response(
+            "What is MCP?",
+            tools=TOOLS_SEARCH,
             tool_manager=mock_tool_manager,
         )
 
-        # Verify the second API call has the expected message structure
-        second_call = mock_client.messages.create.call_args_list[1]
-        messages = second_call[1]["messages"]
+        mock_tool_manager.execute_tool.assert_called_once()
+        tool_results = mock_anthropic.messages.create.call_args_list[1][1]["messages"][
+            -1
+        ]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["tool_1", "tool_2"]
+        assert all(r["content"] == "MCP lesson 1 content" for r in tool_results)
+
+    def test_system_prompt_content(self):
+        """Test that system prompt contains expected guidance"""
+        found = set(_NEEDLE_RE.findall(AIGenerator.SYSTEM_PROMPT))
 
-        # Should have: original user message, assistant tool use, user tool results
-        assert len(messages) == 3
-        assert messages[0]["role"] == "user"
-        assert messages[1]["role"] == "assistant"
-        assert messages[2]["role"] == "user"
+        assert set(_PROMPT_NEEDLES) <= found
+
+    def test_base_params_structure(self, generator):
+        """Test that base parameters are properly structured"""
+
+        expected_params = {
+            "model": MODEL,
+            "temperature": 0,
+            "max_tokens": 800,
+        }
+
+        assert generator.base_params == expected_params
 
     # Sequential Tool Calling Tests
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_two_rounds(self, mock_anthropic):
+    def test_sequential_tool_calling_two_rounds(self, mock_anthropic, generator):
         """Test two-round sequential tool calling"""
         # Round 1: tool use
-        mock_round1_response = Mock()
-        mock_round1_response.stop_reason = "tool_use"
-        mock_tool_block1 = Mock()
-        mock_tool_block1.type = "tool_use"
-        mock_tool_block1.name = "get_course_outline"
-        mock_tool_block1.input = {"course_title": "Course X"}
-        mock_tool_block1.id = "tool_1"
-        mock_round1_response.content = [mock_tool_block1]
+        mock_tool_block1 = tool_block(
+            "get_course_outline", {"course_title": "Course X"}, "tool_1"
+        )
+        mock_round1_response = tool_use_response(mock_tool_block1)
 
         # Round 2: tool use
-        mock_round2_response = Mock()
-        mock_round2_response.stop_reason = "tool_use"
-        mock_tool_block2 = Mock()
-        mock_tool_block2.type = "tool_use"
-        mock_tool_block2.name = "search_course_content"
-        mock_tool_block2.input = {"query": "Advanced Functions"}
-        mock_tool_block2.id = "tool_2"
-        mock_round2_response.content = [mock_tool_block2]
+        mock_tool_block2 = tool_block(
+            "search_course_content", {"query": "Advanced Functions"}, "tool_2"
+        )
+        mock_round2_response = tool_use_response(mock_tool_block2)
 
         # Final response
-        mock_final_response = Mock()
-        mock_final_response.content = [
-            Mock(text="Based on both searches, here's the answer.")
-        ]
+        mock_final_response = text_response(
+            "Based on both searches, here's the answer."
+        )
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_round1_response,
             mock_round2_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         # Mock tool manager
         mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = [
+        mock_tool_manager.execute_tool.side_effect = (
             "Course X outline with lesson 4: Advanced Functions",
             "Found courses covering Advanced Functions",
-        ]
+        )
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
         tools = [{"name": "get_course_outline"}, {"name": "search_course_content"}]
 
         result = generator.generate_response(
@@ -378,26 +445,20 @@ class TestAIGenerator:
 
         assert result == "Based on both searches, here's the answer."
         assert mock_tool_manager.execute_tool.call_count == 2
-        assert mock_client.messages.create.call_count == 3  # 2 rounds + final
+        assert mock_anthropic.messages.create.call_count == 3  # 2 rounds + final
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_early_termination(self, mock_anthropic):
+    def test_sequential_tool_calling_early_termination(self, mock_anthropic, generator):
         """Test early termination when Claude doesn't use tools in first round"""
         # Round 1: direct response (no tool use)
-        mock_round1_response = Mock()
-        mock_round1_response.stop_reason = "end_turn"
-        mock_round1_response.content = [
-            Mock(text="I can answer this directly without tools.")
-        ]
+        mock_round1_response = text_response(
+            "I can answer this directly without tools."
+        )
 
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_round1_response
-        mock_anthropic.return_value = mock_client
+        mock_anthropic.messages.create.return_value = mock_round1_response
 
         mock_tool_manager = Mock()
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response(
             "What is machine learning?",
@@ -408,24 +469,19 @@ class TestAIGenerator:
 
         assert result == "I can answer this directly without tools."
         assert mock_tool_manager.execute_tool.call_count == 0
-        assert mock_client.messages.create.call_count == 1  # Only one round
+        assert mock_anthropic.messages.create.call_count == 1  # Only one round
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_tool_error_handling(self, mock_anthropic):
+    def test_sequential_tool_calling_tool_error_handling(
+        self, mock_anthropic, generator
+    ):
         """Test error handling when tool execution fails"""
         # Round 1: tool use
-        mock_round1_response = Mock()
-        mock_round1_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_1"
-        mock_round1_response.content = [mock_tool_block]
-
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_round1_response
-        mock_anthropic.return_value = mock_client
+        mock_tool_block = tool_block(
+            "search_course_content", {"query": "test"}, "tool_1"
+        )
+        mock_round1_response = tool_use_response(mock_tool_block)
+
+        mock_anthropic.messages.create.return_value = mock_round1_response
 
         # Mock tool manager that raises error
         mock_tool_manager = Mock()
@@ -433,48 +489,42 @@ class TestAIGenerator:
             "Database connection failed"
         )
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        tools = TOOLS_SEARCH
 
-        result = generator.generate_response(
-            "Search for AI content",
-            tools=tools,
-            tool_manager=mock_tool_manager,
-            max_rounds=2,
-        )
+        with pytest.raises(
+            GenerationError, match="Tool execution failed: Database connection failed"
+        ):
+            generator.generate_response(
+                "Search for AI content",
+                tools=tools,
+                tool_manager=mock_tool_manager,
+                max_rounds=2,
+            )
 
-        assert "Tool execution failed: Database connection failed" in result
-        assert mock_client.messages.create.call_count == 1
+        assert mock_anthropic.messages.create.call_count == 1
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_backward_compatibility(self, mock_anthropic):
+    def test_sequential_tool_calling_backward_compatibility(
+        self, mock_anthropic, generator
+    ):
         """Test that max_rounds=1 uses single-round behavior"""
         # Tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_1"
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_block = tool_block(
+            "search_course_content", {"query": "test"}, "tool_1"
+        )
+        mock_tool_response = tool_use_response(mock_tool_block)
 
         # Final response
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Single round result.")]
+        mock_final_response = text_response("Single round result.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_tool_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         mock_tool_manager = Mock()
         mock_tool_manager.execute_tool.return_value = "Search result"
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response(
             "Search query", tools=tools, tool_manager=mock_tool_manager, max_rounds=1
@@ -482,48 +532,37 @@ class TestAIGenerator:
 
         assert result == "Single round result."
         assert mock_tool_manager.execute_tool.call_count == 1
-        assert mock_client.messages.create.call_count == 2
+        assert mock_anthropic.messages.create.call_count == 2
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_max_rounds_reached(self, mock_anthropic):
+    def test_sequential_tool_calling_max_rounds_reached(
+        self, mock_anthropic, generator
+    ):
         """Test that final response is forced when max rounds reached"""
         # Round 1: tool use
-        mock_round1_response = Mock()
-        mock_round1_response.stop_reason = "tool_use"
-        mock_tool_block1 = Mock()
-        mock_tool_block1.type = "tool_use"
-        mock_tool_block1.name = "search_course_content"
-        mock_tool_block1.input = {"query": "first search"}
-        mock_tool_block1.id = "tool_1"
-        mock_round1_response.content = [mock_tool_block1]
+        mock_tool_block1 = tool_block(
+            "search_course_content", {"query": "first search"}, "tool_1"
+        )
+        mock_round1_response = tool_use_response(mock_tool_block1)
 
         # Round 2: tool use (would continue, but max rounds reached)
-        mock_round2_response = Mock()
-        mock_round2_response.stop_reason = "tool_use"
-        mock_tool_block2 = Mock()
-        mock_tool_block2.type = "tool_use"
-        mock_tool_block2.name = "search_course_content"
-        mock_tool_block2.input = {"query": "second search"}
-        mock_tool_block2.id = "tool_2"
-        mock_round2_response.content = [mock_tool_block2]
+        mock_tool_block2 = tool_block(
+            "search_course_content", {"query": "second search"}, "tool_2"
+        )
+        mock_round2_response = tool_use_response(mock_tool_block2)
 
         # Final response without tools
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer after max rounds.")]
+        mock_final_response = text_response("Final answer after max rounds.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = (
             mock_round1_response,
             mock_round2_response,
             mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
+        )
 
         mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = ["Result 1", "Result 2"]
+        mock_tool_manager.execute_tool.side_effect = ("Result 1", "Result 2")
 
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        tools = TOOLS_SEARCH
 
         result = generator.generate_response(
             "Complex query", tools=tools, tool_manager=mock_tool_manager, max_rounds=2
@@ -531,34 +570,212 @@ class TestAIGenerator:
 
         assert result == "Final answer after max rounds."
         assert mock_tool_manager.execute_tool.call_count == 2
-        assert mock_client.messages.create.call_count == 3
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_sequential_tool_calling_api_error(self, mock_anthropic):
-        """Test handling of API errors during sequential rounds"""
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = Exception("API rate limit exceeded")
-        mock_anthropic.return_value = mock_client
+        assert mock_anthropic.messages.create.call_count == 3
+
+    def test_sequential_rounds_compact_older_tool_results(
+        self, mock_anthropic, generator
+    ):
+        """Test that large earlier tool results are stubbed before resending"""
+        mock_anthropic.messages.create.side_effect = (
+            tool_use_response(
+                tool_block("search_course_content", {"query": "first"}, "tool_1")
+            ),
+            tool_use_response(
+                tool_block("search_course_content", {"query": "second"}, "tool_2")
+            ),
+            text_response("Final answer."),
+        )
 
         mock_tool_manager = Mock()
-
-        generator = AIGenerator("test-api-key", "claude-sonnet-4-20250514")
-        tools = [{"name": "search_course_content"}]
+        mock_tool_manager.execute_tool.side_effect = ("a" * 20000, "b" * 10000)
 
         result = generator.generate_response(
-            "Search query", tools=tools, tool_manager=mock_tool_manager, max_rounds=2
+            "Complex query",
+            tools=TOOLS_SEARCH,
+            tool_manager=mock_tool_manager,
+            max_rounds=2,
+        )
+
+        assert result == "Final answer."
+        messages = mock_anthropic.messages.create.call_args.kwargs["messages"]
+        assert messages[0] == {"role": "user", "content": "Complex query"}
+        assert messages[2]["content"] == [
+            {
+                "type": "tool_result",
+                "tool_use_id": "tool_1",
+                "content": "[tool_result omitted: 20000 chars from "
+                "search_course_content]",
+            }
+        ]
+        assert messages[4]["content"][0]["content"] == "b" * 10000
+
+    def test_small_tool_results_are_not_compacted(self):
+        """Test that history under the size limit is left untouched"""
+        messages = [
+            {"role": "user", "content": "Query"},
+            {"role": "assistant", "content": [tool_block("t", {}, "tool_1")]},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "tool_result", "tool_use_id": "tool_1", "content": "x"}
+                ],
+            },
+            {"role": "assistant", "content": [tool_block("t", {}, "tool_2")]},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "tool_result", "tool_use_id": "tool_2", "content": "y"}
+                ],
+            },
+        ]
+
+        AIGenerator._compact_tool_results(messages)
+
+        assert messages[2]["content"][0]["content"] == "x"
+
+    def test_sequential_tool_calling_api_error(self, mock_anthropic, generator):
+        """Test handling of API errors during sequential rounds"""
+        mock_anthropic.messages.create.side_effect = Exception(
+            "API rate limit exceeded"
         )
 
-        assert "Error in round 1: API rate limit exceeded" in result
+        mock_tool_manager = Mock()
+
+        tools = TOOLS_SEARCH
+
+        with pytest.raises(
+            GenerationError, match="Error in round 1: API rate limit exceeded"
+        ):
+            generator.generate_response(
+                "Search query",
+                tools=tools,
+                tool_manager=mock_tool_manager,
+                max_rounds=2,
+            )
 
     def test_system_prompt_updated_for_sequential_calling(self):
         """Test that system prompt supports multi-round calling"""
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
         # Should no longer contain the single search restriction
-        assert "One search per query maximum" not in generator.SYSTEM_PROMPT
+        assert "One search per query maximum" not in AIGenerator.SYSTEM_PROMPT
 
         # Should contain multi-round guidance
-        assert "Multi-Step Search Protocol" in generator.SYSTEM_PROMPT
-        assert "up to 2 tool calls" in generator.SYSTEM_PROMPT
-        assert "separate rounds" in generator.SYSTEM_PROMPT
+        assert "Multi-Step Search Protocol" in AIGenerator.SYSTEM_PROMPT
+        assert "up to 2 tool calls" in AIGenerator.SYSTEM_PROMPT
+        assert "separate rounds" in AIGenerator.SYSTEM_PROMPT
+
+    def test_generate_response_stream_without_tools(self, mock_anthropic, generator):
+        """Test that a direct answer is streamed chunk by chunk"""
+        mock_anthropic.messages.stream.return_value = mock_stream(["Hello", " world"])
+
+        chunks = list(generator.generate_response_stream("What is AI?"))
+
+        assert chunks == ["Hello", " world"]
+        call_kwargs = mock_anthropic.messages.stream.call_args[1]
+        assert "tools" not in call_kwargs
+        mock_anthropic.messages.create.assert_not_called()
+
+    def test_generate_response_stream_with_tool_round(self, mock_anthropic, generator):
+        """Test that tool rounds run between streamed calls"""
+        search_block = tool_block("search_course_content", {"query": "MCP"}, "tool_1")
+
+        mock_anthropic.messages.stream.side_effect = (
+            mock_stream([], stop_reason="tool_use", content=(search_block,)),
+            mock_stream(["MCP is ", "a protocol."]),
+        )
+
+        mock_tool_manager = Mock()
+        mock_tool_manager.execute_tool.return_value = "MCP lesson content"
+
+        tools = TOOLS_SEARCH
+        chunks = list(
+            generator.generate_response_stream(
+                "What is MCP?", tools=tools, tool_manager=mock_tool_manager
+            )
+        )
+
+        assert "".join(chunks) == "MCP is a protocol."
+        assert mock_tool_manager.execute_tool.call_count == 1
+        args, kwargs = mock_tool_manager.execute_tool.call_args
+        assert args == ("search_course_content",) and kwargs == {"query": "MCP"}
+
+        second_call = mock_anthropic.messages.stream.call_args_list[1][1]
+        assert second_call["messages"][-1]["content"][0]["tool_use_id"] == "tool_1"
+
+    def test_generate_response_stream_resets_after_tool_round_preamble(
+        self, mock_anthropic, generator
+    ):
+        """Test that text ahead of a tool call is streamed, then reset"""
+        search_block = tool_block("search_course_content", {"query": "MCP"}, "tool_1")
+
+        mock_anthropic.messages.stream.side_effect = (
+            mock_stream(
+                ["Let me search ", "for that."],
+                stop_reason="tool_use",
+                content=(FakeTextBlock("Let me search for that."), search_block),
+            ),
+            mock_stream(["MCP is ", "a protocol."]),
+        )
+
+        chunks = list(
+            generator.generate_response_stream(
+                "What is MCP?", tools=TOOLS_SEARCH, tool_manager=Mock()
+            )
+        )
+
+        assert chunks == [
+            "Let me search ",
+            "for that.",
+            STREAM_RESET,
+            "MCP is ",
+            "a protocol.",
+        ]
+
+    def test_generate_response_stream_direct_answer_with_tools(
+        self, mock_anthropic, generator
+    ):
+        """Test that an answer given while tools are offered still streams"""
+        mock_anthropic.messages.stream.return_value = mock_stream(["Hello", " there"])
+
+        chunks = list(
+            generator.generate_response_stream(
+                "Hi", tools=TOOLS_SEARCH, tool_manager=Mock()
+            )
+        )
+
+        assert chunks == ["Hello", " there"]
+        assert mock_anthropic.messages.stream.call_count == 1
+
+    def test_generate_response_stream_final_round_has_no_tools(
+        self, mock_anthropic, generator
+    ):
+        """Test that the synthesis call after the last tool round omits tools"""
+        search_block = tool_block("search_course_content", {"query": "x"}, "tool_1")
+
+        mock_anthropic.messages.stream.side_effect = (
+            mock_stream([], stop_reason="tool_use", content=(search_block,)),
+            mock_stream(["Final"]),
+        )
+
+        list(
+            generator.generate_response_stream(
+                "q",
+                tools=TOOLS_SEARCH,
+                tool_manager=Mock(),
+                max_rounds=1,
+            )
+        )
+
+        first_call, final_call = mock_anthropic.messages.stream.call_args_list
+        assert "tools" in first_call[1]
+        assert "tools" not in final_call[1]
+
+    def test_generate_response_stream_api_error(self, mock_anthropic, generator):
+        """Test that API errors are raised apart from the streamed text"""
+        mock_anthropic.messages.stream.side_effect = Exception(
+            "API rate limit exceeded"
+        )
+
+        with pytest.raises(
+            GenerationError, match="Error in round 1: API rate limit exceeded"
+        ):
+            list(generator.generate_response_stream("What is AI?"))
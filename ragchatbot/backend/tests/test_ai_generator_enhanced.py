@@ -3,18 +3,20 @@ Enhanced tests for AIGenerator focusing on tool calling edge cases and error con
 These tests complement the existing tests by focusing on real-world failure scenarios.
 """
 
-import os
-import sys
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import Mock
 
 import pytest
+from ai_generator import AIGenerator
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from .fakes import (
+    FakeMessage,
+    FakeTextBlock,
+    text_response,
+    tool_block,
+    tool_use_response,
+)
 
-from ai_generator import AIGenerator
-from search_tools import CourseSearchTool, ToolManager
-from vector_store import SearchResults, VectorStore
+pytestmark = pytest.mark.unit
 
 
 class TestAIGeneratorToolCallingEdgeCases:
@@ -41,39 +43,29 @@ class TestAIGeneratorToolCallingEdgeCases:
             }
         ]
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_empty_tool_response_handling(
-        self, mock_anthropic, sample_tool_definitions
+        self, mock_anthropic, generator, sample_tool_definitions
     ):
         """Test handling when tool returns empty results"""
         # Mock tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "nonexistent content"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_response = tool_use_response(
+            tool_block(
+                "search_course_content", {"query": "nonexistent content"}, "tool_123"
+            )
+        )
 
         # Mock final response
-        mock_final_response = Mock()
-        mock_final_response.content = [
-            Mock(text="I couldn't find any relevant content.")
-        ]
+        mock_final_response = text_response("I couldn't find any relevant content.")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = [
             mock_tool_response,
             mock_final_response,
         ]
-        mock_anthropic.return_value = mock_client
 
         # Mock tool manager that returns empty results
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "No relevant content found."
-
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        mock_tool_manager = Mock(
+            execute_tool=Mock(return_value="No relevant content found.")
+        )
 
         result = generator.generate_response(
             "Find information about quantum computing",
@@ -86,24 +78,20 @@ class TestAIGeneratorToolCallingEdgeCases:
             "search_course_content", query="nonexistent content"
         )
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_tool_manager_none_handling(self, mock_anthropic, sample_tool_definitions):
+    def test_tool_manager_none_handling(
+        self, mock_anthropic, generator, sample_tool_definitions
+    ):
         """Test handling when tool_manager is None but tools require execution"""
-        # Mock tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_tool_response
-        mock_anthropic.return_value = mock_client
+        # Tool use responses usually lead with a short text block
+        mock_tool_response = FakeMessage(
+            content=(
+                FakeTextBlock("Let me search for that."),
+                tool_block("search_course_content", {"query": "test"}, "tool_123"),
+            ),
+            stop_reason="tool_use",
+        )
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        mock_anthropic.messages.create.return_value = mock_tool_response
 
         # This should return the initial response since no tool manager is provided
         result = generator.generate_response(
@@ -111,30 +99,27 @@ class TestAIGeneratorToolCallingEdgeCases:
         )
 
         # Should return the tool use response content (not execute tools)
-        assert mock_client.messages.create.call_count == 1
+        assert result == "Let me search for that."
+        assert mock_anthropic.messages.create.call_count == 1
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_malformed_tool_response(self, mock_anthropic, sample_tool_definitions):
+    def test_malformed_tool_response(
+        self, mock_anthropic, generator, sample_tool_definitions
+    ):
         """Test handling of malformed tool response from API"""
         # Mock malformed tool response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_response.content = [Mock(type="text", text="Not a tool use block")]
+        mock_tool_response = FakeMessage(
+            content=(FakeTextBlock("Not a tool use block"),), stop_reason="tool_use"
+        )
 
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Handled gracefully")]
+        mock_final_response = text_response("Handled gracefully")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = [
             mock_tool_response,
             mock_final_response,
         ]
-        mock_anthropic.return_value = mock_client
 
         mock_tool_manager = Mock()
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
         result = generator.generate_response(
             "Test query", tools=sample_tool_definitions, tool_manager=mock_tool_manager
         )
@@ -144,104 +129,61 @@ class TestAIGeneratorToolCallingEdgeCases:
         # Tool manager should not be called for malformed tool blocks
         mock_tool_manager.execute_tool.assert_not_called()
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_tool_execution_exception(self, mock_anthropic, sample_tool_definitions):
-        """Test handling when tool execution raises exception"""
-        # Mock tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Error handled gracefully")]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
-
-        # Mock tool manager that raises exception
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = Exception("Tool execution failed")
-
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+    @pytest.mark.parametrize(
+        "exc_msg,with_tools,tool_fails",
+        [
+            ("Request timeout", True, False),
+            ("Rate limit exceeded", False, False),
+            ("Tool execution failed", True, True),
+        ],
+    )
+    def test_api_errors_propagate(
+        self,
+        mock_anthropic,
+        generator,
+        sample_tool_definitions,
+        exc_msg,
+        with_tools,
+        tool_fails,
+    ):
+        """Test handling of API timeout, rate limit and tool execution errors"""
+        error = Exception(exc_msg)
+        tools = sample_tool_definitions if with_tools else None
+        mock_tool_manager = None
+        if tool_fails:
+            mock_anthropic.messages.create.return_value = tool_use_response(
+                tool_block("search_course_content", {"query": "test"}, "tool_123")
+            )
+            mock_tool_manager = Mock(execute_tool=Mock(side_effect=error))
+        else:
+            mock_anthropic.messages.create.side_effect = error
 
-        # Should handle tool execution error gracefully
-        with pytest.raises(Exception):
+        with pytest.raises(Exception, match=exc_msg):
             generator.generate_response(
-                "Test query",
-                tools=sample_tool_definitions,
-                tool_manager=mock_tool_manager,
+                "Test query", tools=tools, tool_manager=mock_tool_manager
             )
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_api_timeout_handling(self, mock_anthropic, sample_tool_definitions):
-        """Test handling of API timeout errors"""
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = Exception("Request timeout")
-        mock_anthropic.return_value = mock_client
-
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
-        with pytest.raises(Exception) as exc_info:
-            generator.generate_response("Test query", tools=sample_tool_definitions)
-
-        assert "timeout" in str(exc_info.value).lower()
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_api_rate_limit_handling(self, mock_anthropic):
-        """Test handling of API rate limit errors"""
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = Exception("Rate limit exceeded")
-        mock_anthropic.return_value = mock_client
-
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
-        with pytest.raises(Exception) as exc_info:
-            generator.generate_response("Test query")
-
-        assert "rate limit" in str(exc_info.value).lower()
-
-    @patch("ai_generator.anthropic.Anthropic")
     def test_invalid_tool_name_in_response(
-        self, mock_anthropic, sample_tool_definitions
+        self, mock_anthropic, generator, sample_tool_definitions
     ):
         """Test handling when API returns invalid tool name"""
         # Mock tool response with invalid tool name
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "nonexistent_tool"
-        mock_tool_block.input = {"query": "test"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Tool not found handled")]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_tool_response = tool_use_response(
+            tool_block("nonexistent_tool", {"query": "test"}, "tool_123")
+        )
+
+        mock_final_response = text_response("Tool not found handled")
+
+        mock_anthropic.messages.create.side_effect = [
             mock_tool_response,
             mock_final_response,
         ]
-        mock_anthropic.return_value = mock_client
 
         # Mock tool manager that returns error for unknown tool
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = (
-            "Tool 'nonexistent_tool' not found"
+        mock_tool_manager = Mock(
+            execute_tool=Mock(return_value="Tool 'nonexistent_tool' not found")
         )
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
         result = generator.generate_response(
             "Test query", tools=sample_tool_definitions, tool_manager=mock_tool_manager
         )
@@ -251,93 +193,67 @@ class TestAIGeneratorToolCallingEdgeCases:
             "nonexistent_tool", query="test"
         )
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_empty_conversation_history(self, mock_anthropic):
+    def test_empty_conversation_history(self, mock_anthropic, generator):
         """Test handling of empty conversation history"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Response without history")]
-        mock_response.stop_reason = "end_turn"
-
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
+        mock_response = text_response("Response without history")
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        mock_anthropic.messages.create.return_value = mock_response
 
         result = generator.generate_response("Test query", conversation_history="")
 
         assert result == "Response without history"
 
         # Verify system prompt doesn't include empty history
-        call_args = mock_client.messages.create.call_args
-        system_content = call_args[1]["system"]
-        assert "Previous conversation:" not in system_content
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_very_long_conversation_history(self, mock_anthropic):
-        """Test handling of very long conversation history"""
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Response with long history")]
-        mock_response.stop_reason = "end_turn"
-
-        mock_client = Mock()
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
-
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
-
-        # Create very long history
-        long_history = (
-            "User: "
-            + "What is AI? " * 1000
-            + "\nAssistant: "
-            + "AI is artificial intelligence. " * 1000
-        )
+        call_args = mock_anthropic.messages.create.call_args
+        system_blocks = call_args[1]["system"]
+        assert len(system_blocks) == 1
+        assert "Previous conversation:" not in system_blocks[0]["text"]
+
+    def test_conversation_history_included(self, mock_anthropic, generator):
+        """Test that conversation history reaches the system prompt"""
+        mock_response = text_response("Response with history")
+
+        mock_anthropic.messages.create.return_value = mock_response
+
+        # The history is passed through verbatim, so its size does not matter
+        history = "User: What is AI?\nAssistant: AI is artificial intelligence."
 
         result = generator.generate_response(
-            "Follow up question", conversation_history=long_history
+            "Follow up question", conversation_history=history
         )
 
-        assert result == "Response with long history"
+        assert result == "Response with history"
 
         # Verify history was included
-        call_args = mock_client.messages.create.call_args
-        system_content = call_args[1]["system"]
-        assert "Previous conversation:" in system_content
+        call_args = mock_anthropic.messages.create.call_args
+        system_blocks = call_args[1]["system"]
+        assert system_blocks[-1]["text"] == f"Previous conversation:\n{history}"
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_tool_input_parameter_validation(
-        self, mock_anthropic, sample_tool_definitions
+        self, mock_anthropic, generator, sample_tool_definitions
     ):
         """Test that tool input parameters are properly passed"""
         # Mock tool use with multiple parameters
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {
-            "query": "machine learning",
-            "course_name": "AI Fundamentals",
-            "lesson_number": 3,
-        }
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Found content")]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_tool_response = tool_use_response(
+            tool_block(
+                "search_course_content",
+                {
+                    "query": "machine learning",
+                    "course_name": "AI Fundamentals",
+                    "lesson_number": 3,
+                },
+                "tool_123",
+            )
+        )
+
+        mock_final_response = text_response("Found content")
+
+        mock_anthropic.messages.create.side_effect = [
             mock_tool_response,
             mock_final_response,
         ]
-        mock_anthropic.return_value = mock_client
-
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Search results"
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        mock_tool_manager = Mock(execute_tool=Mock(return_value="Search results"))
 
         result = generator.generate_response(
             "Find ML content in AI course lesson 3",
@@ -355,60 +271,49 @@ class TestAIGeneratorToolCallingEdgeCases:
 
     def test_system_prompt_completeness(self):
         """Test that system prompt contains all necessary instructions"""
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        prompt = AIGenerator.SYSTEM_PROMPT
+        lowered = prompt.lower()
 
         # Verify key components of system prompt
-        assert "course materials" in generator.SYSTEM_PROMPT
-        assert "Content Search Tool" in generator.SYSTEM_PROMPT
-        assert "Course Outline Tool" in generator.SYSTEM_PROMPT
-        assert "One search per query maximum" in generator.SYSTEM_PROMPT
-        assert "direct answers only" in generator.SYSTEM_PROMPT
-        assert "Brief, Concise and focused" in generator.SYSTEM_PROMPT
+        required = (
+            "course materials",
+            "Content Search Tool",
+            "Course Outline Tool",
+            "One search per query maximum",
+            "direct answers only",
+            "Brief, Concise and focused",
+        )
+        missing = [s for s in required if s not in prompt]
 
         # Verify response guidelines
-        assert "educational content" in generator.SYSTEM_PROMPT.lower()
-        assert "clear" in generator.SYSTEM_PROMPT.lower()
-        assert "example-supported" in generator.SYSTEM_PROMPT.lower()
+        guidelines = ("educational content", "clear", "example-supported")
+        missing += [s for s in guidelines if s not in lowered]
+
+        assert not missing, missing
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_concurrent_tool_calls_handling(
-        self, mock_anthropic, sample_tool_definitions
+        self, mock_anthropic, generator, sample_tool_definitions
     ):
         """Test handling of concurrent/multiple tool calls in single response"""
         # Create multiple tool blocks
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-
-        tool_block1 = Mock()
-        tool_block1.type = "tool_use"
-        tool_block1.name = "search_course_content"
-        tool_block1.input = {"query": "AI basics"}
-        tool_block1.id = "tool_1"
-
-        tool_block2 = Mock()
-        tool_block2.type = "tool_use"
-        tool_block2.name = "search_course_content"
-        tool_block2.input = {"query": "machine learning"}
-        tool_block2.id = "tool_2"
-
-        mock_tool_response.content = [tool_block1, tool_block2]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [
-            Mock(text="Combined results from multiple searches")
-        ]
+        mock_tool_response = tool_use_response(
+            tool_block("search_course_content", {"query": "AI basics"}, "tool_1"),
+            tool_block(
+                "search_course_content", {"query": "machine learning"}, "tool_2"
+            ),
+        )
+
+        mock_final_response = text_response("Combined results from multiple searches")
 
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
+        mock_anthropic.messages.create.side_effect = [
             mock_tool_response,
             mock_final_response,
         ]
-        mock_anthropic.return_value = mock_client
-
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = ["Result 1", "Result 2"]
 
-        generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
+        mock_tool_manager = Mock(
+            execute_tool=Mock(side_effect=["Result 1", "Result 2"])
+        )
+        mock_tool_manager.for_request.return_value = mock_tool_manager
 
         result = generator.generate_response(
             "Compare AI basics and machine learning",
@@ -419,9 +324,11 @@ class TestAIGeneratorToolCallingEdgeCases:
         assert result == "Combined results from multiple searches"
         assert mock_tool_manager.execute_tool.call_count == 2
 
-        # Verify both tools were called with correct parameters
-        calls = mock_tool_manager.execute_tool.call_args_list
-        assert calls[0][0] == ("search_course_content",)
-        assert calls[0][1] == {"query": "AI basics"}
-        assert calls[1][0] == ("search_course_content",)
-        assert calls[1][1] == {"query": "machine learning"}
+        # Verify both tools were called with correct parameters; they run
+        # concurrently, so the call order is not fixed
+        mock_tool_manager.execute_tool.assert_any_call(
+            "search_course_content", query="AI basics"
+        )
+        mock_tool_manager.execute_tool.assert_any_call(
+            "search_course_content", query="machine learning"
+        )
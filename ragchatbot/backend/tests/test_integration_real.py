@@ -3,37 +3,85 @@ Integration tests with real components to catch configuration and data flow issu
 These tests use real ChromaDB, real document processing, and minimal mocking.
 """
 
-import os
-import shutil
-import sys
-import tempfile
-from unittest.mock import Mock, patch
+import re
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from ai_generator import AIGenerator
+from chromadb.utils import embedding_functions
 from config import Config
 from models import Course, CourseChunk, Lesson
 from rag_system import RAGSystem
 from search_tools import CourseSearchTool, ToolManager
 from vector_store import SearchResults, VectorStore
 
-
+from .fake_embeddings import FakeEmbeddingFunction
+from .fakes import text_response, tool_block, tool_use_response
+from .fixtures import MEMORY_CHROMA_PREFIX
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+# Acceptable wording for errors raised by ChromaDB and model loading
+_PATH_ERROR_RE = re.compile(r"path|permission", re.IGNORECASE)
+_MODEL_ERROR_RE = re.compile(r"model|embedding", re.IGNORECASE)
+
+# Pydantic models are built and validated once, not per test
+_SAMPLE_COURSE = Course(
+    title="Test Course",
+    course_link="https://example.com/course",
+    instructor="Test Instructor",
+    lessons=[
+        Lesson(
+            lesson_number=1,
+            title="Introduction",
+            lesson_link="https://example.com/lesson1",
+        ),
+        Lesson(
+            lesson_number=2,
+            title="Advanced Topics",
+            lesson_link="https://example.com/lesson2",
+        ),
+    ],
+)
+
+_SAMPLE_CHUNKS = (
+    CourseChunk(
+        content="This is an introduction to machine learning concepts and algorithms.",
+        course_title="Test Course",
+        lesson_number=1,
+        chunk_index=0,
+    ),
+    CourseChunk(
+        content="Advanced topics include neural networks, deep learning, and transformers.",
+        course_title="Test Course",
+        lesson_number=2,
+        chunk_index=1,
+    ),
+    CourseChunk(
+        content="Practical applications of AI in real-world scenarios and case studies.",
+        course_title="Test Course",
+        lesson_number=2,
+        chunk_index=2,
+    ),
+)
+
+# One search for "machine learning", then a final answer
+_SEARCH_RESPONSE = tool_use_response(
+    tool_block("search_course_content", {"query": "machine learning"}, "tool_123")
+)
+_FINAL_ANSWER = "Based on the search results, machine learning is..."
+
+
+@pytest.mark.usefixtures("cached_embedding_function")
 class TestRealIntegrationIssues:
     """Test real integration issues that mocked tests miss"""
 
-    @pytest.fixture
-    def temp_chroma_path(self):
-        """Create temporary ChromaDB path"""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    @pytest.fixture(scope="class")
+    def temp_chroma_path(self, in_memory_chroma):
+        """In-memory ChromaDB path shared by the class"""
+        yield f"{MEMORY_CHROMA_PREFIX}real_integration"
+        in_memory_chroma.delete_database("real_integration")
 
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def real_config(self, temp_chroma_path):
         """Create a real config for testing"""
         config = Config()
@@ -42,49 +90,41 @@ class TestRealIntegrationIssues:
         # NOTE: This test will reveal the MAX_RESULTS=0 bug
         return config
 
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def sample_course_data(self):
-        """Create sample course data for testing"""
-        course = Course(
-            title="Test Course",
-            course_link="https://example.com/course",
-            instructor="Test Instructor",
-            lessons=[
-                Lesson(
-                    lesson_number=1,
-                    title="Introduction",
-                    lesson_link="https://example.com/lesson1",
-                ),
-                Lesson(
-                    lesson_number=2,
-                    title="Advanced Topics",
-                    lesson_link="https://example.com/lesson2",
-                ),
-            ],
-        )
+        """Sample course and chunks shared by every test"""
+        return _SAMPLE_COURSE, _SAMPLE_CHUNKS
+
+    @pytest.fixture(scope="class")
+    def shared_vector_store(self, real_config, sample_course_data):
+        """Build and populate one real vector store for the read-only tests"""
+        course, chunks = sample_course_data
+
+        # These tests check plumbing, not retrieval quality, so the store gets
+        # the fake embedder; test_course_search_tool_with_fixed_config keeps
+        # exercising the real model
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(
+                embedding_functions,
+                "SentenceTransformerEmbeddingFunction",
+                FakeEmbeddingFunction,
+            )
+            vector_store = VectorStore(
+                real_config.CHROMA_PATH,
+                real_config.EMBEDDING_MODEL,
+                real_config.MAX_RESULTS,
+            )
+        vector_store.add_course(course, chunks)
+        return vector_store
 
-        chunks = [
-            CourseChunk(
-                content="This is an introduction to machine learning concepts and algorithms.",
-                course_title="Test Course",
-                lesson_number=1,
-                chunk_index=0,
-            ),
-            CourseChunk(
-                content="Advanced topics include neural networks, deep learning, and transformers.",
-                course_title="Test Course",
-                lesson_number=2,
-                chunk_index=1,
-            ),
-            CourseChunk(
-                content="Practical applications of AI in real-world scenarios and case studies.",
-                course_title="Test Course",
-                lesson_number=2,
-                chunk_index=2,
-            ),
-        ]
-
-        return course, chunks
+    @pytest.fixture
+    def search_tool_flow(self, mock_anthropic):
+        """Script the mock client to search once and then answer"""
+        mock_anthropic.messages.create.side_effect = (
+            _SEARCH_RESPONSE,
+            text_response(_FINAL_ANSWER),
+        )
+        return mock_anthropic
 
     def test_config_max_results_bug(self, real_config):
         """Test reveals the MAX_RESULTS=0 configuration bug"""
@@ -94,24 +134,11 @@ class TestRealIntegrationIssues:
         ), "MAX_RESULTS=0 will cause all searches to return empty results!"
 
     def test_vector_store_real_search_empty_results(
-        self, real_config, sample_course_data
+        self, real_config, shared_vector_store
     ):
         """Test vector store with real ChromaDB - should reveal MAX_RESULTS=0 issue"""
-        course, chunks = sample_course_data
-
-        # Create real vector store
-        vector_store = VectorStore(
-            real_config.CHROMA_PATH,
-            real_config.EMBEDDING_MODEL,
-            real_config.MAX_RESULTS,
-        )
-
-        # Add real data
-        vector_store.add_course_metadata(course)
-        vector_store.add_course_content(chunks)
-
         # Search should return results, but will fail due to MAX_RESULTS=0
-        results = vector_store.search("machine learning")
+        results = shared_vector_store.search("machine learning")
 
         if real_config.MAX_RESULTS == 0:
             # This will fail - reveals the bug!
@@ -124,23 +151,10 @@ class TestRealIntegrationIssues:
             ), "Search should return results with valid data"
             assert len(results.documents) > 0
 
-    def test_course_search_tool_real_execution(self, real_config, sample_course_data):
+    def test_course_search_tool_real_execution(self, real_config, shared_vector_store):
         """Test CourseSearchTool with real vector store"""
-        course, chunks = sample_course_data
-
-        # Create real vector store
-        vector_store = VectorStore(
-            real_config.CHROMA_PATH,
-            real_config.EMBEDDING_MODEL,
-            real_config.MAX_RESULTS,
-        )
-
-        # Add real data
-        vector_store.add_course_metadata(course)
-        vector_store.add_course_content(chunks)
-
         # Create and test search tool
-        search_tool = CourseSearchTool(vector_store)
+        search_tool = CourseSearchTool(shared_vector_store)
         result = search_tool.execute("machine learning concepts")
 
         if real_config.MAX_RESULTS == 0:
@@ -154,21 +168,20 @@ class TestRealIntegrationIssues:
             assert len(search_tool.last_sources) > 0
 
     def test_course_search_tool_with_fixed_config(
-        self, temp_chroma_path, sample_course_data
+        self, isolated_chroma_path, sample_course_data
     ):
         """Test CourseSearchTool with corrected configuration"""
         course, chunks = sample_course_data
 
         # Create vector store with FIXED config
         vector_store = VectorStore(
-            temp_chroma_path,
+            isolated_chroma_path,
             "all-MiniLM-L6-v2",
             max_results=5,  # FIXED: Use proper max_results
         )
 
         # Add real data
-        vector_store.add_course_metadata(course)
-        vector_store.add_course_content(chunks)
+        vector_store.add_course(course, chunks)
 
         # Create and test search tool
         search_tool = CourseSearchTool(vector_store)
@@ -180,49 +193,15 @@ class TestRealIntegrationIssues:
         assert "machine learning" in result.lower()
         assert len(search_tool.last_sources) > 0
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_ai_generator_tool_calling_real_flow(
-        self, mock_anthropic, real_config, sample_course_data
+        self, search_tool_flow, real_config, shared_vector_store
     ):
         """Test AI generator tool calling with real tools and real vector store"""
-        course, chunks = sample_course_data
-
-        # Create real components
-        vector_store = VectorStore(
-            real_config.CHROMA_PATH,
-            real_config.EMBEDDING_MODEL,
-            real_config.MAX_RESULTS,
-        )
-        vector_store.add_course_metadata(course)
-        vector_store.add_course_content(chunks)
-
         # Create real tool manager with real search tool
         tool_manager = ToolManager()
-        search_tool = CourseSearchTool(vector_store)
+        search_tool = CourseSearchTool(shared_vector_store)
         tool_manager.register_tool(search_tool)
 
-        # Mock anthropic responses
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "machine learning"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [
-            Mock(text="Based on the search results, machine learning is...")
-        ]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
-
         # Test AI generator with real tools
         ai_generator = AIGenerator("test-key", "claude-sonnet-4-20250514")
 
@@ -243,44 +222,18 @@ class TestRealIntegrationIssues:
             ), "Tool should return empty due to MAX_RESULTS=0"
         else:
             # With proper config, tool should return actual content
-            assert result == "Based on the search results, machine learning is..."
+            assert result == _FINAL_ANSWER
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_rag_system_end_to_end_real_flow(
-        self, mock_anthropic, real_config, sample_course_data
+        self, search_tool_flow, real_config, shared_vector_store, monkeypatch
     ):
         """Test complete RAG system end-to-end with real components"""
-        course, chunks = sample_course_data
-
-        # Mock only the Anthropic API
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.input = {"query": "machine learning"}
-        mock_tool_block.id = "tool_123"
-        mock_tool_response.content = [mock_tool_block]
-
-        mock_final_response = Mock()
-        mock_final_response.content = [
-            Mock(text="Here's what I found about machine learning...")
-        ]
-
-        mock_client = Mock()
-        mock_client.messages.create.side_effect = [
-            mock_tool_response,
-            mock_final_response,
-        ]
-        mock_anthropic.return_value = mock_client
-
-        # Create RAG system with real config (which has the bug)
+        # Create RAG system over the already populated store
+        monkeypatch.setattr(
+            "rag_system.VectorStore", lambda *args, **kwargs: shared_vector_store
+        )
         rag_system = RAGSystem(real_config)
 
-        # Add real course data
-        rag_system.vector_store.add_course_metadata(course)
-        rag_system.vector_store.add_course_content(chunks)
-
         # Test end-to-end query
         response, sources = rag_system.query("What is machine learning?")
 
@@ -290,13 +243,13 @@ class TestRealIntegrationIssues:
                 len(sources) == 0
             ), "Sources empty due to MAX_RESULTS=0 causing search to return nothing"
         else:
-            assert response == "Here's what I found about machine learning..."
+            assert response == _FINAL_ANSWER
             assert len(sources) > 0
 
-    def test_empty_chromadb_behavior(self, real_config):
+    def test_empty_chromadb_behavior(self, real_config, isolated_chroma_path):
         """Test behavior with empty ChromaDB"""
         vector_store = VectorStore(
-            real_config.CHROMA_PATH,
+            isolated_chroma_path,
             real_config.EMBEDDING_MODEL,
             real_config.MAX_RESULTS,
         )
@@ -324,17 +277,17 @@ class TestRealIntegrationIssues:
             assert results.error is not None or results.is_empty()
         except Exception as e:
             # Expected behavior - should fail gracefully
-            assert "path" in str(e).lower() or "permission" in str(e).lower()
+            assert _PATH_ERROR_RE.search(str(e))
 
-    def test_missing_embedding_model(self, temp_chroma_path):
+    def test_missing_embedding_model(self, isolated_chroma_path):
         """Test behavior with invalid embedding model"""
         try:
             vector_store = VectorStore(
-                temp_chroma_path, "nonexistent-model", max_results=5
+                isolated_chroma_path, "nonexistent-model", max_results=5
             )
             # If it creates without error, search should fail gracefully
             results = vector_store.search("test")
             assert results.error is not None
         except Exception as e:
             # Expected - should fail during model loading
-            assert "model" in str(e).lower() or "embedding" in str(e).lower()
+            assert _MODEL_ERROR_RE.search(str(e))
@@ -0,0 +1,51 @@
+import pytest
+from query_classifier import (
+    CONTENT_MAX_TOKENS,
+    OUTLINE_MAX_TOKENS,
+    is_general_query,
+    max_tokens_for,
+)
+
+
+class TestIsGeneralQuery:
+    """Test suite for the tool-free query heuristic"""
+
+    @pytest.mark.parametrize(
+        "query",
+        ["Hello", "hi there!", "Thanks.", "Who are you?", "2 + 2", "What is 12 * 7?"],
+    )
+    def test_small_talk_and_arithmetic_are_general(self, query):
+        """Test that conversational and arithmetic queries skip tools"""
+        assert is_general_query(query) is True
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "What is AI?",
+            "Hello, what does lesson 2 cover?",
+            "Outline the MCP course",
+            "Thanks! Can you compare lesson 1 and lesson 3?",
+            "",
+        ],
+    )
+    def test_questions_keep_tools(self, query):
+        """Test that real or ambiguous questions still use the tools"""
+        assert is_general_query(query) is False
+
+
+class TestMaxTokensFor:
+    """Test suite for the per-query output token limit"""
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("Give me the outline of the MCP course", OUTLINE_MAX_TOKENS),
+            ("What lessons are in the RAG course?", OUTLINE_MAX_TOKENS),
+            ("What does lesson 3 say about embeddings?", CONTENT_MAX_TOKENS),
+            ("Which courses cover prompt caching?", CONTENT_MAX_TOKENS),
+            ("What is AI?", None),
+        ],
+    )
+    def test_limit_by_query_class(self, query, expected):
+        """Test that outline and content questions get tighter limits"""
+        assert max_tokens_for(query) == expected
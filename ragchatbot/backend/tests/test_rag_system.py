@@ -1,52 +1,57 @@
 import os
-import sys
-import tempfile
-from unittest.mock import MagicMock, Mock, patch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import DEFAULT, MagicMock, Mock, patch
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+from ai_generator import STREAM_RESET, GenerationError
 from config import Config
 from models import Course, CourseChunk, Lesson
 from rag_system import RAGSystem
 
+# VectorStore is patched wherever this is used, so nothing ever opens it
+MOCKED_CHROMA_PATH = "unused://mock"
+
 
 class TestRAGSystem:
     """Integration test suite for RAG system"""
 
     @pytest.fixture
     def test_config(self):
-        """Create test configuration"""
+        """Create test configuration for the fully mocked tests"""
         config = Config()
         config.ANTHROPIC_API_KEY = "test-api-key"
-        config.CHROMA_PATH = tempfile.mkdtemp()
+        config.CHROMA_PATH = MOCKED_CHROMA_PATH
         config.MAX_RESULTS = 3
         return config
 
     @pytest.fixture
     def mock_components(self):
         """Mock all major components for isolated testing"""
-        with patch("rag_system.DocumentProcessor") as mock_doc_proc, patch(
-            "rag_system.VectorStore"
-        ) as mock_vector_store, patch("rag_system.AIGenerator") as mock_ai_gen, patch(
-            "rag_system.SessionManager"
-        ) as mock_session_mgr:
-
-            # Configure mocks
-            mock_doc_proc.return_value = Mock()
-            mock_vector_store.return_value = Mock()
-            mock_ai_gen.return_value = Mock()
-            mock_session_mgr.return_value = Mock()
-
+        with patch.multiple(
+            "rag_system",
+            new_callable=Mock,
+            DocumentProcessor=DEFAULT,
+            VectorStore=DEFAULT,
+            AIGenerator=DEFAULT,
+            SessionManager=DEFAULT,
+        ) as mocks:
             yield {
-                "doc_processor": mock_doc_proc.return_value,
-                "vector_store": mock_vector_store.return_value,
-                "ai_generator": mock_ai_gen.return_value,
-                "session_manager": mock_session_mgr.return_value,
+                "doc_processor": mocks["DocumentProcessor"].return_value,
+                "vector_store": mocks["VectorStore"].return_value,
+                "ai_generator": mocks["AIGenerator"].return_value,
+                "session_manager": mocks["SessionManager"].return_value,
             }
 
+    @pytest.fixture
+    def rag(self, test_config, mock_components):
+        """RAGSystem wired to the mocked components, reporting no sources"""
+        rag = RAGSystem(test_config)
+        # Serve every query from the registered manager so tests can stub it
+        rag.tool_manager.for_request = Mock(return_value=rag.tool_manager)
+        rag.tool_manager.get_last_sources = Mock(return_value=[])
+        return rag
+
     def test_init_creates_all_components(self, test_config):
         """Test RAGSystem initialization creates all required components"""
         with patch("rag_system.DocumentProcessor"), patch(
@@ -64,24 +69,19 @@ class TestRAGSystem:
             assert rag.search_tool is not None
             assert rag.outline_tool is not None
 
-    def test_init_registers_tools(self, test_config, mock_components):
+    def test_init_registers_tools(self, rag):
         """Test that tools are properly registered during initialization"""
-        rag = RAGSystem(test_config)
-
         # Verify tools are registered
         assert "search_course_content" in rag.tool_manager.tools
         assert "get_course_outline" in rag.tool_manager.tools
 
-    def test_query_successful_without_session(self, test_config, mock_components):
+    def test_query_successful_without_session(self, rag, mock_components):
         """Test successful query processing without session"""
         mock_components["ai_generator"].generate_response.return_value = (
             "Generated response"
         )
         mock_components["vector_store"].search.return_value = Mock()
 
-        rag = RAGSystem(test_config)
-        rag.tool_manager.get_last_sources = Mock(return_value=[])
-
         response, sources = rag.query("What is AI?")
 
         assert response == "Generated response"
@@ -94,7 +94,182 @@ class TestRAGSystem:
         assert call_args[1]["tools"] is not None
         assert call_args[1]["tool_manager"] is not None
 
-    def test_query_successful_with_session(self, test_config, mock_components):
+    def test_query_served_from_semantic_cache(self, test_config, mock_components):
+        """Test that a semantic cache hit skips the AI generator"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
+        cached_sources = [{"text": "Cached Course", "link": None}]
+
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            mock_cache = mock_cache_cls.return_value
+            mock_cache.lookup.return_value = ("Cached response", cached_sources)
+
+            rag = RAGSystem(test_config)
+            response, sources = rag.query("What is AI?")
+
+        assert response == "Cached response"
+        assert sources == cached_sources
+        mock_components["ai_generator"].generate_response.assert_not_called()
+        mock_cache.add.assert_not_called()
+
+    def test_query_miss_populates_semantic_cache(self, test_config, mock_components):
+        """Test that a cache miss stores the generated answer"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
+        mock_components["ai_generator"].generate_response.return_value = "Fresh"
+
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            mock_cache = mock_cache_cls.return_value
+            mock_cache.lookup.return_value = None
+
+            rag = RAGSystem(test_config)
+            rag.query("What is AI?")
+
+        mock_cache.add.assert_called_once_with(
+            mock_cache.embed.return_value, "What is AI?", "Fresh", []
+        )
+
+    def test_query_failure_not_cached(self, test_config, mock_components):
+        """Test that a failed generation is returned but never cached"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
+        mock_components["ai_generator"].generate_response.side_effect = GenerationError(
+            "Error in round 1: Overloaded"
+        )
+
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            mock_cache = mock_cache_cls.return_value
+            mock_cache.lookup.return_value = None
+
+            rag = RAGSystem(test_config)
+            response, sources = rag.query("What is AI?")
+
+        assert response == "Error in round 1: Overloaded"
+        assert sources == []
+        mock_cache.add.assert_not_called()
+
+    def test_query_stream_reset_discards_tool_round_text(
+        self, test_config, mock_components
+    ):
+        """Test that text before a reset reaches neither the cache nor history"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
+        mock_components["ai_generator"].generate_response_stream.return_value = iter(
+            ["Let me search.", STREAM_RESET, "MCP is ", "a protocol."]
+        )
+
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            mock_cache = mock_cache_cls.return_value
+            mock_cache.lookup.return_value = None
+
+            rag = RAGSystem(test_config)
+            events = list(rag.query_stream("What is MCP?"))
+
+        assert [event["type"] for event in events] == [
+            "delta",
+            "reset",
+            "delta",
+            "delta",
+            "done",
+        ]
+        mock_cache.add.assert_called_once_with(
+            mock_cache.embed.return_value, "What is MCP?", "MCP is a protocol.", []
+        )
+
+    def test_query_stream_failure_not_cached(self, test_config, mock_components):
+        """Test that a stream ending in an error is shown but never cached"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
+
+        def partial_then_fail(*args, **kwargs):
+            yield "MCP is "
+            raise GenerationError("Error in round 2: Overloaded")
+
+        mock_components["ai_generator"].generate_response_stream.side_effect = (
+            partial_then_fail
+        )
+
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            mock_cache = mock_cache_cls.return_value
+            mock_cache.lookup.return_value = None
+
+            rag = RAGSystem(test_config)
+            events = list(rag.query_stream("What is MCP?"))
+
+        deltas = [event["text"] for event in events if event["type"] == "delta"]
+        assert deltas == ["MCP is ", "Error in round 2: Overloaded"]
+        assert events[-1] == {"type": "done", "sources": []}
+        mock_cache.add.assert_not_called()
+
+    @pytest.fixture
+    def stream_follower_joined(self, rag, monkeypatch):
+        """Event set once a second caller joins a query already in flight"""
+        joined = threading.Event()
+        claim = rag._coalescer.claim
+
+        def claim_and_report(key):
+            future, is_leader = claim(key)
+            if not is_leader:
+                joined.set()
+            return future, is_leader
+
+        monkeypatch.setattr(rag._coalescer, "claim", claim_and_report)
+        return joined
+
+    def test_query_stream_joins_identical_query_in_flight(
+        self, rag, mock_components, stream_follower_joined
+    ):
+        """Test that an identical streamed query reuses the answer in flight"""
+        mock_components["ai_generator"].generate_response_stream.return_value = iter(
+            ["MCP is ", "a protocol."]
+        )
+
+        leader = rag.query_stream("What is MCP?")
+        first_event = next(leader)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            follower = pool.submit(lambda: list(rag.query_stream("what is  MCP?")))
+            assert stream_follower_joined.wait(timeout=5)
+            leader_events = [first_event, *leader]
+            follower_events = follower.result(timeout=5)
+
+        assert leader_events == [
+            {"type": "delta", "text": "MCP is "},
+            {"type": "delta", "text": "a protocol."},
+            {"type": "done", "sources": []},
+        ]
+        assert follower_events == [
+            {"type": "delta", "text": "MCP is a protocol."},
+            {"type": "done", "sources": []},
+        ]
+        mock_components["ai_generator"].generate_response_stream.assert_called_once()
+
+    def test_query_stream_abandoned_leader_fails_followers(
+        self, rag, mock_components, stream_follower_joined
+    ):
+        """Test that followers are released when the leading client disconnects"""
+        mock_components["ai_generator"].generate_response_stream.return_value = iter(
+            ["MCP is ", "a protocol."]
+        )
+
+        leader = rag.query_stream("What is MCP?")
+        next(leader)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            follower = pool.submit(lambda: list(rag.query_stream("What is MCP?")))
+            assert stream_follower_joined.wait(timeout=5)
+            leader.close()
+
+            with pytest.raises(RuntimeError, match="abandoned"):
+                follower.result(timeout=5)
+
+        assert rag._coalescer._in_flight == {}
+
+    def test_query_small_talk_skips_tools(self, rag, mock_components):
+        """Test that small talk is answered without offering tools"""
+        mock_components["ai_generator"].generate_response.return_value = "Hi!"
+
+        response, _ = rag.query("Hello")
+
+        assert response == "Hi!"
+        call_args = mock_components["ai_generator"].generate_response.call_args
+        assert call_args[1]["tools"] is None
+        assert call_args[1]["tool_manager"] is None
+
+    def test_query_successful_with_session(self, rag, mock_components):
         """Test successful query processing with session"""
         mock_components["ai_generator"].generate_response.return_value = (
             "Response with context"
@@ -103,9 +278,6 @@ class TestRAGSystem:
             "Previous conversation"
         )
 
-        rag = RAGSystem(test_config)
-        rag.tool_manager.get_last_sources = Mock(return_value=[])
-
         response, sources = rag.query("Follow up question", session_id="test-session")
 
         assert response == "Response with context"
@@ -116,7 +288,7 @@ class TestRAGSystem:
         ].get_conversation_history.assert_called_once_with("test-session")
         mock_components["session_manager"].add_exchange.assert_called_once()
 
-    def test_query_with_sources(self, test_config, mock_components):
+    def test_query_with_sources(self, rag, mock_components):
         """Test query processing that returns sources"""
         mock_components["ai_generator"].generate_response.return_value = (
             "Answer with sources"
@@ -126,34 +298,28 @@ class TestRAGSystem:
             {"text": "Course 2 - Lesson 2", "link": None},
         ]
 
-        rag = RAGSystem(test_config)
-        rag.tool_manager.get_last_sources = Mock(return_value=mock_sources)
-        rag.tool_manager.reset_sources = Mock()
+        rag.tool_manager.get_last_sources.return_value = mock_sources
 
         response, sources = rag.query("Search for content")
 
         assert response == "Answer with sources"
         assert sources == mock_sources
 
-        # Verify sources were retrieved and reset
+        # Verify sources were retrieved from the query's own manager
+        rag.tool_manager.for_request.assert_called_once()
         rag.tool_manager.get_last_sources.assert_called_once()
-        rag.tool_manager.reset_sources.assert_called_once()
 
-    def test_query_ai_generator_error(self, test_config, mock_components):
+    def test_query_ai_generator_error(self, rag, mock_components):
         """Test query handling when AI generator raises error"""
         mock_components["ai_generator"].generate_response.side_effect = Exception(
             "API Error"
         )
 
-        rag = RAGSystem(test_config)
-
-        with pytest.raises(Exception) as exc_info:
+        with pytest.raises(Exception, match="API Error"):
             rag.query("Test query")
 
-        assert "API Error" in str(exc_info.value)
-
     def test_add_course_document_successful(
-        self, test_config, mock_components, sample_course, sample_course_chunks
+        self, rag, mock_components, sample_course, sample_course_chunks
     ):
         """Test successful course document addition"""
         mock_components["doc_processor"].process_course_document.return_value = (
@@ -161,8 +327,6 @@ class TestRAGSystem:
             sample_course_chunks,
         )
 
-        rag = RAGSystem(test_config)
-
         course, chunk_count = rag.add_course_document("/path/to/course.txt")
 
         assert course == sample_course
@@ -172,140 +336,118 @@ class TestRAGSystem:
         mock_components[
             "doc_processor"
         ].process_course_document.assert_called_once_with("/path/to/course.txt")
-        mock_components["vector_store"].add_course_metadata.assert_called_once_with(
-            sample_course
-        )
-        mock_components["vector_store"].add_course_content.assert_called_once_with(
-            sample_course_chunks
-        )
-
-    def test_add_course_document_processing_error(self, test_config, mock_components):
-        """Test course document addition when processing fails"""
-        mock_components["doc_processor"].process_course_document.side_effect = (
-            Exception("Processing failed")
+        mock_components["vector_store"].add_course.assert_called_once_with(
+            sample_course, sample_course_chunks
         )
 
-        rag = RAGSystem(test_config)
+    @patch("rag_system.os.path.exists", return_value=False)
+    def test_rebuild_clears_semantic_cache(
+        self, mock_exists, test_config, mock_components
+    ):
+        """Test that clearing the store also drops cached answers"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
 
-        course, chunk_count = rag.add_course_document("/path/to/invalid.txt")
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            rag = RAGSystem(test_config)
+            rag.add_course_folder("/path/to/docs", clear_existing=True)
 
-        assert course is None
-        assert chunk_count == 0
+        mock_components["vector_store"].clear_all_data.assert_called_once()
+        mock_cache_cls.return_value.clear.assert_called_once()
 
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.os.listdir")
-    def test_add_course_folder_successful(
-        self,
-        mock_listdir,
-        mock_exists,
-        test_config,
-        mock_components,
-        sample_course,
-        sample_course_chunks,
+    def test_add_course_document_clears_semantic_cache(
+        self, test_config, mock_components, sample_course, sample_course_chunks
     ):
-        """Test successful course folder processing"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = [
-            "course1.txt",
-            "course2.pdf",
-            "course3.docx",
-            "readme.md",
-        ]
-
-        # Mock existing course titles (empty initially)
-        mock_components["vector_store"].get_existing_course_titles.return_value = []
-
-        # Mock document processing
+        """Test that new course content invalidates cached answers"""
+        test_config.SEMANTIC_CACHE_ENABLED = True
         mock_components["doc_processor"].process_course_document.return_value = (
             sample_course,
             sample_course_chunks,
         )
 
-        rag = RAGSystem(test_config)
-
-        courses, chunks = rag.add_course_folder("/path/to/docs", clear_existing=False)
-
-        assert courses == 3  # 3 valid course files
-        assert chunks == len(sample_course_chunks) * 3
+        with patch("rag_system.SemanticCache") as mock_cache_cls:
+            rag = RAGSystem(test_config)
+            rag.add_course_document("/path/to/course.txt")
 
-        # Verify only valid file types were processed
-        assert mock_components["doc_processor"].process_course_document.call_count == 3
+        mock_cache_cls.return_value.clear.assert_called_once()
 
-    @patch("rag_system.os.path.exists")
-    def test_add_course_folder_nonexistent(
-        self, mock_exists, test_config, mock_components
-    ):
-        """Test course folder processing when folder doesn't exist"""
-        mock_exists.return_value = False
-
-        rag = RAGSystem(test_config)
+    def test_add_course_document_processing_error(self, rag, mock_components):
+        """Test course document addition when processing fails"""
+        mock_components["doc_processor"].process_course_document.side_effect = (
+            Exception("Processing failed")
+        )
 
-        courses, chunks = rag.add_course_folder("/nonexistent/path")
+        course, chunk_count = rag.add_course_document("/path/to/invalid.txt")
 
-        assert courses == 0
-        assert chunks == 0
+        assert course is None
+        assert chunk_count == 0
 
-    @patch("rag_system.os.path.exists")
+    @pytest.mark.parametrize(
+        "exists,listing,existing_titles,clear_existing,expected_courses",
+        [
+            (
+                True,
+                ["course1.txt", "course2.pdf", "course3.docx", "readme.md"],
+                [],
+                False,
+                3,
+            ),
+            (False, [], [], False, 0),
+            (True, ["course1.txt", "course2.txt"], ["course1"], False, 1),
+            (True, ["course1.txt"], [], True, 1),
+        ],
+        ids=["valid-files-only", "nonexistent", "skips-existing", "clear-existing"],
+    )
+    @patch("rag_system.os.path.isfile", return_value=True)
     @patch("rag_system.os.listdir")
-    def test_add_course_folder_with_existing_courses(
+    @patch("rag_system.os.path.exists")
+    def test_add_course_folder(
         self,
-        mock_listdir,
         mock_exists,
-        test_config,
+        mock_listdir,
+        mock_isfile,
+        rag,
         mock_components,
         sample_course,
         sample_course_chunks,
+        exists,
+        listing,
+        existing_titles,
+        clear_existing,
+        expected_courses,
     ):
-        """Test folder processing with some existing courses"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["course1.txt", "course2.txt"]
-
-        # Mock one existing course
-        mock_components["vector_store"].get_existing_course_titles.return_value = [
-            "Sample Course"
-        ]
-        mock_components["doc_processor"].process_course_document.return_value = (
-            sample_course,
-            sample_course_chunks,
+        """Test folder processing adds each new course document once"""
+        mock_exists.return_value = exists
+        mock_listdir.return_value = listing
+        mock_components["vector_store"].get_existing_course_titles.return_value = (
+            existing_titles
         )
 
-        rag = RAGSystem(test_config)
-
-        courses, chunks = rag.add_course_folder("/path/to/docs")
+        # Each file yields a course titled after its name, e.g. "course1"
+        def process(file_path):
+            title = os.path.splitext(os.path.basename(file_path))[0]
+            return (
+                sample_course.model_copy(update={"title": title}),
+                sample_course_chunks,
+            )
 
-        # Should skip the existing course, only add one new one
-        assert courses == 1
-        assert chunks == len(sample_course_chunks)
+        mock_components["doc_processor"].process_course_document.side_effect = process
 
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.os.listdir")
-    def test_add_course_folder_clear_existing(
-        self,
-        mock_listdir,
-        mock_exists,
-        test_config,
-        mock_components,
-        sample_course,
-        sample_course_chunks,
-    ):
-        """Test folder processing with clear_existing=True"""
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["course1.txt"]
-
-        mock_components["vector_store"].get_existing_course_titles.return_value = []
-        mock_components["doc_processor"].process_course_document.return_value = (
-            sample_course,
-            sample_course_chunks,
+        courses, chunks = rag.add_course_folder(
+            "/path/to/docs", clear_existing=clear_existing
         )
 
-        rag = RAGSystem(test_config)
-
-        courses, chunks = rag.add_course_folder("/path/to/docs", clear_existing=True)
+        assert courses == expected_courses
+        assert chunks == len(sample_course_chunks) * expected_courses
+        assert mock_components["vector_store"].add_course.call_count == expected_courses
+        assert mock_components["vector_store"].clear_all_data.called == clear_existing
 
-        # Verify data was cleared
-        mock_components["vector_store"].clear_all_data.assert_called_once()
+        # Only .pdf, .docx and .txt files are processed
+        processed = mock_components[
+            "doc_processor"
+        ].process_course_document.call_args_list
+        assert not any(call.args[0].endswith(".md") for call in processed)
 
-    def test_get_course_analytics(self, test_config, mock_components):
+    def test_get_course_analytics(self, rag, mock_components):
         """Test course analytics retrieval"""
         mock_components["vector_store"].get_course_count.return_value = 5
         mock_components["vector_store"].get_existing_course_titles.return_value = [
@@ -314,20 +456,15 @@ class TestRAGSystem:
             "Course 3",
         ]
 
-        rag = RAGSystem(test_config)
-
         analytics = rag.get_course_analytics()
 
         assert analytics["total_courses"] == 5
         assert len(analytics["course_titles"]) == 3
 
-    def test_query_prompt_formatting(self, test_config, mock_components):
+    def test_query_prompt_formatting(self, rag, mock_components):
         """Test that query prompts are properly formatted"""
         mock_components["ai_generator"].generate_response.return_value = "Response"
 
-        rag = RAGSystem(test_config)
-        rag.tool_manager.get_last_sources = Mock(return_value=[])
-
         rag.query("What is machine learning?")
 
         # Verify the prompt format
@@ -336,7 +473,7 @@ class TestRAGSystem:
         assert "Answer this question about course materials:" in prompt
         assert "What is machine learning?" in prompt
 
-    def test_session_management_flow(self, test_config, mock_components):
+    def test_session_management_flow(self, rag, mock_components):
         """Test complete session management flow"""
         mock_components["ai_generator"].generate_response.return_value = (
             "Session response"
@@ -345,9 +482,6 @@ class TestRAGSystem:
             "Previous context"
         )
 
-        rag = RAGSystem(test_config)
-        rag.tool_manager.get_last_sources = Mock(return_value=[])
-
         query_text = "Continue our discussion"
         session_id = "test-session-123"
 
@@ -363,42 +497,68 @@ class TestRAGSystem:
             session_id, query_text, "Session response"
         )
 
-    def test_tool_manager_integration(self, test_config, mock_components):
+    def test_tool_manager_integration(self, rag, mock_components):
         """Test tool manager integration in query flow"""
         mock_components["ai_generator"].generate_response.return_value = (
             "Tool-enhanced response"
         )
 
-        rag = RAGSystem(test_config)
-
         # Mock tool manager methods
         rag.tool_manager.get_tool_definitions = Mock(
             return_value=[{"name": "test_tool"}]
         )
-        rag.tool_manager.get_last_sources = Mock(return_value=[])
-        rag.tool_manager.reset_sources = Mock()
 
         response, sources = rag.query("Search for AI content")
 
         # Verify tool manager was properly integrated
         rag.tool_manager.get_tool_definitions.assert_called_once()
         rag.tool_manager.get_last_sources.assert_called_once()
-        rag.tool_manager.reset_sources.assert_called_once()
 
         # Verify AI generator received tool definitions and manager
         call_args = mock_components["ai_generator"].generate_response.call_args
         assert call_args[1]["tools"] == [{"name": "test_tool"}]
         assert call_args[1]["tool_manager"] == rag.tool_manager
 
+    def test_concurrent_queries_run_in_parallel_with_own_sources(
+        self, test_config, mock_components
+    ):
+        """Test that distinct queries are not serialized and keep their sources"""
+        queries = [f"Search for topic {i}" for i in range(4)]
+        # Only passable if all four generations are in flight at once
+        all_in_flight = threading.Barrier(len(queries), timeout=5)
+
+        def search_then_answer(query, tool_manager=None, **kwargs):
+            search_tool = tool_manager.tools["search_course_content"]
+            search_tool.last_sources = [{"text": query, "link": None}]
+            all_in_flight.wait()
+            return f"Answer to {query}"
+
+        mock_components["ai_generator"].generate_response.side_effect = (
+            search_then_answer
+        )
+        rag = RAGSystem(test_config)
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            results = list(pool.map(rag.query, queries))
+
+        for query, (response, sources) in zip(queries, results):
+            assert query in response
+            assert len(sources) == 1
+            assert query in sources[0]["text"]
+        # The registered tools never hold a query's sources
+        assert rag.tool_manager.get_last_sources() == []
 
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("cached_embedding_function")
 class TestRAGSystemRealIntegration:
     """Integration tests with minimal mocking for real component interaction"""
 
-    def test_real_config_validation(self):
+    def test_real_config_validation(self, isolated_chroma_path):
         """Test RAG system with real config but mocked external dependencies"""
         config = Config()
         config.ANTHROPIC_API_KEY = ""  # Empty API key
-        config.CHROMA_PATH = tempfile.mkdtemp()
+        config.CHROMA_PATH = isolated_chroma_path
 
         with patch("rag_system.AIGenerator") as mock_ai_gen:
             mock_ai_gen.return_value = Mock()
@@ -407,11 +567,11 @@ class TestRAGSystemRealIntegration:
             rag = RAGSystem(config)
             assert rag.config.ANTHROPIC_API_KEY == ""
 
-    def test_missing_api_key_behavior(self):
+    def test_missing_api_key_behavior(self, isolated_chroma_path):
         """Test behavior when API key is missing"""
         config = Config()
         config.ANTHROPIC_API_KEY = ""
-        config.CHROMA_PATH = tempfile.mkdtemp()
+        config.CHROMA_PATH = isolated_chroma_path
 
         with patch("rag_system.AIGenerator") as mock_ai_gen:
             # Mock AI generator to raise API key error
@@ -423,18 +583,16 @@ class TestRAGSystemRealIntegration:
 
             rag = RAGSystem(config)
 
-            with pytest.raises(Exception) as exc_info:
+            with pytest.raises(Exception, match="Invalid API key"):
                 rag.query("Test query")
 
-            assert "Invalid API key" in str(exc_info.value)
-
     @patch("rag_system.os.path.exists")
     def test_document_loading_integration(self, mock_exists):
         """Test document loading integration with real document processor"""
         mock_exists.return_value = False  # No docs folder
 
         config = Config()
-        config.CHROMA_PATH = tempfile.mkdtemp()
+        config.CHROMA_PATH = MOCKED_CHROMA_PATH
 
         with patch("rag_system.AIGenerator"), patch(
             "rag_system.VectorStore"
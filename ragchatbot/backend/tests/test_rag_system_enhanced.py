@@ -3,533 +3,443 @@ Enhanced RAG system tests focusing on real-world edge cases and error conditions
 These tests complement existing tests by testing actual integration issues.
 """
 
-import os
-import shutil
-import sys
-import tempfile
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import DEFAULT, Mock, create_autospec, patch
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from config import Config
 from models import Course, CourseChunk, Lesson
 from rag_system import RAGSystem
-from vector_store import SearchResults
+from search_tools import ToolManager
+from vector_store import SearchResults, VectorStore
+
+from .fixtures import MEMORY_CHROMA_PREFIX
+
+# A 100-exchange conversation history
+_LONG_HISTORY = "\n".join(
+    f"User: Question {i}\nAssistant: Answer {i}" for i in range(100)
+)
 
 
 class TestRAGSystemRealWorldScenarios:
     """Test RAG system with real-world scenarios and edge cases"""
 
-    @pytest.fixture
-    def temp_chroma_path(self):
-        """Create temporary ChromaDB path"""
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    @pytest.fixture(scope="class")
+    def chroma_path(self, in_memory_chroma):
+        """In-memory ChromaDB database owned by this class"""
+        # Created up front so teardown works even if every test mocked the store
+        in_memory_chroma.create_database("rag_scenarios")
+        yield f"{MEMORY_CHROMA_PREFIX}rag_scenarios"
+        in_memory_chroma.delete_database("rag_scenarios")
 
-    @pytest.fixture
-    def working_config(self, temp_chroma_path):
+    @pytest.fixture(scope="class")
+    def working_config(self, chroma_path):
         """Create a working config with proper MAX_RESULTS"""
         config = Config()
-        config.CHROMA_PATH = temp_chroma_path
+        config.CHROMA_PATH = chroma_path
         config.ANTHROPIC_API_KEY = "test-key"
         config.MAX_RESULTS = 5  # Fix the bug!
         return config
 
-    @pytest.fixture
-    def broken_config(self, temp_chroma_path):
-        """Create config with the original bug (MAX_RESULTS=0)"""
-        config = Config()
-        config.CHROMA_PATH = temp_chroma_path
-        config.ANTHROPIC_API_KEY = "test-key"
-        config.MAX_RESULTS = 0  # The bug that causes "query failed"
-        return config
+    @pytest.fixture(scope="class")
+    def class_vector_store(self, working_config):
+        """One real vector store per class, so the embedding model loads once"""
+        return VectorStore(
+            working_config.CHROMA_PATH,
+            working_config.EMBEDDING_MODEL,
+            working_config.MAX_RESULTS,
+        )
 
-    def test_query_with_broken_config_reveals_bug(self, broken_config):
-        """Test that broken config causes query failures"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            # Mock AI generator to use tools
-            mock_tool_response = Mock()
-            mock_tool_response.stop_reason = "tool_use"
-            mock_tool_block = Mock()
-            mock_tool_block.type = "tool_use"
-            mock_tool_block.name = "search_course_content"
-            mock_tool_block.input = {"query": "test"}
-            mock_tool_block.id = "tool_123"
-            mock_tool_response.content = [mock_tool_block]
-
-            mock_final_response = Mock()
-            mock_final_response.content = [
-                Mock(text="I couldn't find relevant information.")
-            ]
-
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_tool_response,
-                mock_final_response,
-            ]
-            mock_ai_gen.return_value.client.messages.create = (
-                mock_client.messages.create
-            )
-            mock_ai_gen.return_value.generate_response.side_effect = (
-                lambda *args, **kwargs: "I couldn't find relevant information."
-            )
+    @pytest.fixture(autouse=True)
+    def shared_vector_store(self, request, monkeypatch):
+        """Hand the class store to every RAGSystem and empty it after the test"""
 
-            rag = RAGSystem(broken_config)
+        def reuse_store(chroma_path, embedding_model, max_results):
+            # Looked up lazily so tests that mock VectorStore never load a model
+            store = request.getfixturevalue("class_vector_store")
+            store.max_results = max_results
+            request.addfinalizer(store.clear_all_data)
+            return store
 
-            # Add some test data
-            test_course = Course(
-                title="Test Course",
-                course_link="https://example.com",
-                instructor="Test Instructor",
-                lessons=[],
-            )
-            test_chunks = [
-                CourseChunk(
-                    content="This is test content about machine learning.",
-                    course_title="Test Course",
-                    lesson_number=1,
-                    chunk_index=0,
-                )
-            ]
-
-            rag.vector_store.add_course_metadata(test_course)
-            rag.vector_store.add_course_content(test_chunks)
-
-            # Query should fail due to MAX_RESULTS=0
-            response, sources = rag.query("What is machine learning?")
+        monkeypatch.setattr("rag_system.VectorStore", reuse_store)
 
-            # The bug causes empty sources because search returns no results
-            assert len(sources) == 0, "MAX_RESULTS=0 causes empty sources"
-
-    def test_query_with_working_config(self, working_config):
-        """Test that working config allows successful queries"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            # Mock successful AI response
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "Here's information about machine learning..."
-            )
+    @pytest.fixture
+    def mocked_vector_store(self, monkeypatch):
+        """Autospec'd store for tests that never run a real search"""
+        store = create_autospec(VectorStore, instance=True)
+        monkeypatch.setattr("rag_system.VectorStore", Mock(return_value=store))
+        return store
 
-            rag = RAGSystem(working_config)
-
-            # Add some test data
-            test_course = Course(
-                title="Test Course",
-                course_link="https://example.com",
-                instructor="Test Instructor",
-                lessons=[
-                    Lesson(
-                        lesson_number=1,
-                        title="ML Basics",
-                        lesson_link="https://example.com/lesson1",
-                    )
-                ],
+    @pytest.fixture
+    def last_sources(self):
+        """Stub the sources ToolManager reports; tests set return_value"""
+        with patch.object(ToolManager, "get_last_sources", return_value=[]) as mock:
+            yield mock
+
+    @pytest.fixture(scope="class")
+    def sample_corpus(self):
+        """Catalog-only courses plus one course with lessons and chunks"""
+        courses = [
+            Course(
+                title=f"Course {i}",
+                course_link=f"https://example.com/course{i}",
+                instructor=f"Instructor {i}",
+                lessons=[],
             )
-            test_chunks = [
-                CourseChunk(
-                    content="This is test content about machine learning algorithms and concepts.",
-                    course_title="Test Course",
+            for i in range(5)
+        ]
+        lesson_course = Course(
+            title="Source Test Course",
+            course_link="https://example.com/course",
+            instructor="Test Instructor",
+            lessons=[
+                Lesson(
+                    lesson_number=1,
+                    title="Intro",
+                    lesson_link="https://example.com/lesson1",
+                ),
+                Lesson(
+                    lesson_number=2,
+                    title="Advanced",
+                    lesson_link="https://example.com/lesson2",
+                ),
+            ],
+        )
+        lesson_chunks = [
+            CourseChunk(
+                content="Introduction content",
+                course_title="Source Test Course",
+                lesson_number=1,
+                chunk_index=0,
+            ),
+            CourseChunk(
+                content="Advanced content",
+                course_title="Source Test Course",
+                lesson_number=2,
+                chunk_index=1,
+            ),
+        ]
+        return {"courses": courses, "lesson_course": (lesson_course, lesson_chunks)}
+
+    @pytest.fixture(autouse=True)
+    def mocked_rag_deps(self):
+        """Patch the processor, session manager and generator for every test"""
+        # Autospec keeps the mocks to the real signatures and attributes
+        with patch.multiple(
+            "rag_system",
+            autospec=True,
+            DocumentProcessor=DEFAULT,
+            SessionManager=DEFAULT,
+            AIGenerator=DEFAULT,
+        ) as mocks:
+            yield {
+                "doc_processor": mocks["DocumentProcessor"].return_value,
+                "session_manager": mocks["SessionManager"].return_value,
+                "ai_generator": mocks["AIGenerator"].return_value,
+            }
+
+    @pytest.mark.slow
+    @pytest.mark.parametrize(
+        "max_results, expected_sources",
+        [(0, 0), (5, 1)],
+        ids=["broken-max-results", "working-max-results"],
+    )
+    def test_query_max_results(
+        self,
+        working_config,
+        mocked_rag_deps,
+        monkeypatch,
+        max_results,
+        expected_sources,
+    ):
+        """Test that MAX_RESULTS=0 leaves queries without sources"""
+        monkeypatch.setattr(working_config, "MAX_RESULTS", max_results)
+
+        def search_then_answer(*args, tool_manager=None, **kwargs):
+            # Run the search the model would ask for
+            tool_manager.execute_tool("search_course_content", query="machine learning")
+            return "Here's information about machine learning..."
+
+        mocked_rag_deps["ai_generator"].generate_response.side_effect = (
+            search_then_answer
+        )
+
+        rag = RAGSystem(working_config)
+
+        # Add some test data
+        test_course = Course(
+            title="Test Course",
+            course_link="https://example.com",
+            instructor="Test Instructor",
+            lessons=[
+                Lesson(
                     lesson_number=1,
-                    chunk_index=0,
+                    title="ML Basics",
+                    lesson_link="https://example.com/lesson1",
                 )
-            ]
-
-            rag.vector_store.add_course_metadata(test_course)
-            rag.vector_store.add_course_content(test_chunks)
-
-            # Mock the tool manager to return sources
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "Test Course - Lesson 1",
-                        "link": "https://example.com/lesson1",
-                    }
-                ]
+            ],
+        )
+        test_chunks = [
+            CourseChunk(
+                content="This is test content about machine learning algorithms and concepts.",
+                course_title="Test Course",
+                lesson_number=1,
+                chunk_index=0,
             )
+        ]
+
+        rag.vector_store.add_course(test_course, test_chunks)
 
-            response, sources = rag.query("What is machine learning?")
+        response, sources = rag.query("What is machine learning?")
 
-            # With working config, should get results
-            assert response == "Here's information about machine learning..."
-            assert len(sources) > 0
+        # The bug causes empty sources because search returns no results
+        assert response == "Here's information about machine learning..."
+        assert len(sources) == expected_sources
 
-    def test_query_with_empty_database(self, working_config):
+    @pytest.mark.slow
+    def test_query_with_empty_database(self, working_config, mocked_rag_deps):
         """Test query behavior with empty database"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            # Mock AI response for empty search
-            mock_tool_response = Mock()
-            mock_tool_response.stop_reason = "tool_use"
-            mock_tool_block = Mock()
-            mock_tool_block.type = "tool_use"
-            mock_tool_block.name = "search_course_content"
-            mock_tool_block.input = {"query": "test"}
-            mock_tool_block.id = "tool_123"
-            mock_tool_response.content = [mock_tool_block]
-
-            mock_final_response = Mock()
-            mock_final_response.content = [
-                Mock(text="I don't have information about that topic.")
-            ]
-
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_tool_response,
-                mock_final_response,
-            ]
-
-            def mock_generate_response(*args, **kwargs):
-                if kwargs.get("tool_manager"):
-                    # Simulate tool execution with empty database
-                    tool_result = kwargs["tool_manager"].execute_tool(
-                        "search_course_content", query="test"
-                    )
-                    return "I don't have information about that topic."
-                return "I don't have information about that topic."
-
-            mock_ai_gen.return_value.generate_response.side_effect = (
-                mock_generate_response
-            )
 
-            rag = RAGSystem(working_config)
-            # No data added to database
+        def mock_generate_response(*args, **kwargs):
+            if kwargs.get("tool_manager"):
+                # Simulate tool execution with empty database
+                kwargs["tool_manager"].execute_tool(
+                    "search_course_content", query="test"
+                )
+            return "I don't have information about that topic."
 
-            response, sources = rag.query("What is quantum computing?")
+        mocked_rag_deps["ai_generator"].generate_response.side_effect = (
+            mock_generate_response
+        )
 
-            assert "don't have information" in response
-            assert len(sources) == 0
+        rag = RAGSystem(working_config)
+        # No data added to database
 
-    def test_query_with_missing_api_key(self, working_config):
-        """Test query behavior with missing API key"""
-        working_config.ANTHROPIC_API_KEY = ""
+        response, sources = rag.query("What is quantum computing?")
 
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
+        assert "don't have information" in response
+        assert len(sources) == 0
 
-            # Mock API error for missing key
-            mock_ai_gen.return_value.generate_response.side_effect = Exception(
-                "Invalid API key"
-            )
+    @pytest.mark.usefixtures("mocked_vector_store")
+    def test_query_with_missing_api_key(
+        self, working_config, monkeypatch, mocked_rag_deps
+    ):
+        """Test query behavior with missing API key"""
+        monkeypatch.setattr(working_config, "ANTHROPIC_API_KEY", "")
 
-            rag = RAGSystem(working_config)
+        # Mock API error for missing key
+        mocked_rag_deps["ai_generator"].generate_response.side_effect = Exception(
+            "Invalid API key"
+        )
 
-            with pytest.raises(Exception) as exc_info:
-                rag.query("Test query")
+        rag = RAGSystem(working_config)
 
-            assert "Invalid API key" in str(exc_info.value)
+        with pytest.raises(Exception, match="Invalid API key"):
+            rag.query("Test query")
 
-    def test_session_management_with_long_history(self, working_config):
+    @pytest.mark.usefixtures("mocked_vector_store", "last_sources")
+    def test_session_management_with_long_history(
+        self, working_config, mocked_rag_deps
+    ):
         """Test session management with very long conversation history"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ) as mock_session_mgr, patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            # Create very long history
-            long_history = "\n".join(
-                [f"User: Question {i}\nAssistant: Answer {i}" for i in range(100)]
-            )
-            mock_session_mgr.return_value.get_conversation_history.return_value = (
-                long_history
-            )
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "Response with long history"
-            )
-
-            rag = RAGSystem(working_config)
-            rag.tool_manager.get_last_sources = Mock(return_value=[])
-
-            response, sources = rag.query(
-                "Follow up question", session_id="long-session"
-            )
-
-            # Should handle long history gracefully
-            assert response == "Response with long history"
-            mock_session_mgr.return_value.get_conversation_history.assert_called_once_with(
-                "long-session"
-            )
-
-    def test_concurrent_queries_session_isolation(self, working_config):
+        mocked_rag_deps["session_manager"].get_conversation_history.return_value = (
+            _LONG_HISTORY
+        )
+        mocked_rag_deps["ai_generator"].generate_response.return_value = (
+            "Response with long history"
+        )
+
+        rag = RAGSystem(working_config)
+
+        response, sources = rag.query("Follow up question", session_id="long-session")
+
+        # Should handle long history gracefully
+        assert response == "Response with long history"
+        mocked_rag_deps[
+            "session_manager"
+        ].get_conversation_history.assert_called_once_with("long-session")
+
+    @pytest.mark.usefixtures("mocked_vector_store", "last_sources")
+    def test_concurrent_queries_session_isolation(
+        self, working_config, mocked_rag_deps
+    ):
         """Test that concurrent queries with different sessions are isolated"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ) as mock_session_mgr, patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            # Mock different histories for different sessions
-            def mock_get_history(session_id):
-                if session_id == "session1":
-                    return "User: About AI\nAssistant: AI info"
-                elif session_id == "session2":
-                    return "User: About ML\nAssistant: ML info"
-                return None
-
-            mock_session_mgr.return_value.get_conversation_history.side_effect = (
-                mock_get_history
-            )
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "Session-specific response"
-            )
-
-            rag = RAGSystem(working_config)
-            rag.tool_manager.get_last_sources = Mock(return_value=[])
-
-            # Query with session 1
-            response1, _ = rag.query("Follow up about AI", session_id="session1")
-
-            # Query with session 2
-            response2, _ = rag.query("Follow up about ML", session_id="session2")
-
-            # Both should get responses but with different contexts
-            assert response1 == "Session-specific response"
-            assert response2 == "Session-specific response"
-
-            # Verify correct sessions were used
-            calls = (
-                mock_session_mgr.return_value.get_conversation_history.call_args_list
-            )
-            assert calls[0][0] == ("session1",)
-            assert calls[1][0] == ("session2",)
 
-    def test_tool_execution_error_handling(self, working_config):
+        # Mock different histories for different sessions
+        def mock_get_history(session_id):
+            if session_id == "session1":
+                return "User: About AI\nAssistant: AI info"
+            elif session_id == "session2":
+                return "User: About ML\nAssistant: ML info"
+            return None
+
+        mocked_rag_deps["session_manager"].get_conversation_history.side_effect = (
+            mock_get_history
+        )
+        mocked_rag_deps["ai_generator"].generate_response.return_value = (
+            "Session-specific response"
+        )
+
+        rag = RAGSystem(working_config)
+
+        # Query with session 1
+        response1, _ = rag.query("Follow up about AI", session_id="session1")
+
+        # Query with session 2
+        response2, _ = rag.query("Follow up about ML", session_id="session2")
+
+        # Both should get responses but with different contexts
+        assert response1 == "Session-specific response"
+        assert response2 == "Session-specific response"
+
+        # Verify correct sessions were used
+        calls = mocked_rag_deps[
+            "session_manager"
+        ].get_conversation_history.call_args_list
+        assert calls[0][0] == ("session1",)
+        assert calls[1][0] == ("session2",)
+
+    @pytest.mark.usefixtures("mocked_vector_store")
+    def test_tool_execution_error_handling(self, working_config, mocked_rag_deps):
         """Test handling of tool execution errors during query"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            rag = RAGSystem(working_config)
-
-            # Mock tool manager to raise error
-            rag.tool_manager.execute_tool = Mock(
-                side_effect=Exception("ChromaDB connection failed")
-            )
-            rag.tool_manager.get_tool_definitions = Mock(
-                return_value=[{"name": "search_course_content"}]
-            )
-
-            mock_ai_gen.return_value.generate_response.side_effect = Exception(
-                "Tool execution failed"
-            )
-
-            with pytest.raises(Exception) as exc_info:
-                rag.query("Search for content")
-
-            assert "Tool execution failed" in str(exc_info.value)
-
-    def test_large_document_processing(self, working_config):
+        rag = RAGSystem(working_config)
+
+        # Mock tool manager to raise error
+        rag.tool_manager.execute_tool = Mock(
+            side_effect=Exception("ChromaDB connection failed")
+        )
+        rag.tool_manager.get_tool_definitions = Mock(
+            return_value=[{"name": "search_course_content"}]
+        )
+
+        mocked_rag_deps["ai_generator"].generate_response.side_effect = Exception(
+            "Tool execution failed"
+        )
+
+        with pytest.raises(Exception, match="Tool execution failed"):
+            rag.query("Search for content")
+
+    @pytest.mark.usefixtures("mocked_vector_store")
+    def test_large_document_processing(
+        self, working_config, mocked_rag_deps, large_course_bundle
+    ):
         """Test processing very large documents"""
-        with patch("rag_system.DocumentProcessor") as mock_doc_proc, patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator"):
-
-            # Mock processing of large document
-            large_course = Course(
-                title="Large Course",
-                course_link="https://example.com",
-                instructor="Test Instructor",
-                lessons=[
-                    Lesson(
-                        lesson_number=i,
-                        title=f"Lesson {i}",
-                        lesson_link=f"https://example.com/lesson{i}",
-                    )
-                    for i in range(1, 101)
-                ],
-            )
+        # Mock processing of large document
+        large_course, large_chunks = large_course_bundle
+        mocked_rag_deps["doc_processor"].process_course_document.return_value = (
+            large_course,
+            large_chunks,
+        )
 
-            # Create many chunks
-            large_chunks = [
-                CourseChunk(
-                    content=f"Content for chunk {i} with detailed information about topic {i}.",
-                    course_title="Large Course",
-                    lesson_number=(i % 10) + 1,
-                    chunk_index=i,
-                )
-                for i in range(1000)
-            ]
+        rag = RAGSystem(working_config)
 
-            mock_doc_proc.return_value.process_course_document.return_value = (
-                large_course,
-                large_chunks,
-            )
-
-            rag = RAGSystem(working_config)
-
-            course, chunk_count = rag.add_course_document("/path/to/large_course.txt")
+        course, chunk_count = rag.add_course_document("/path/to/large_course.txt")
 
-            assert course.title == "Large Course"
-            assert chunk_count == 1000
+        assert course.title == "Large Course"
+        assert chunk_count == 1000
 
-            # Verify data was added to vector store
-            assert rag.vector_store.add_course_metadata.call_count == 1
-            assert rag.vector_store.add_course_content.call_count == 1
+        # Verify data was added to vector store
+        rag.vector_store.add_course.assert_called_once_with(large_course, large_chunks)
 
-    def test_document_processing_corruption_handling(self, working_config):
+    @pytest.mark.usefixtures("mocked_vector_store")
+    def test_document_processing_corruption_handling(
+        self, working_config, mocked_rag_deps
+    ):
         """Test handling of corrupted document processing"""
-        with patch("rag_system.DocumentProcessor") as mock_doc_proc, patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator"):
-
-            # Mock corrupted document processing
-            mock_doc_proc.return_value.process_course_document.side_effect = Exception(
-                "Corrupted file format"
-            )
+        # Mock corrupted document processing
+        mocked_rag_deps["doc_processor"].process_course_document.side_effect = (
+            Exception("Corrupted file format")
+        )
 
-            rag = RAGSystem(working_config)
+        rag = RAGSystem(working_config)
 
-            course, chunk_count = rag.add_course_document("/path/to/corrupted.txt")
+        course, chunk_count = rag.add_course_document("/path/to/corrupted.txt")
 
-            # Should handle corruption gracefully
-            assert course is None
-            assert chunk_count == 0
+        # Should handle corruption gracefully
+        assert course is None
+        assert chunk_count == 0
 
-    def test_analytics_with_real_data(self, working_config):
+    @pytest.mark.slow
+    def test_analytics_with_real_data(self, working_config, sample_corpus):
         """Test analytics with real course data"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator"):
-
-            rag = RAGSystem(working_config)
-
-            # Add multiple courses
-            courses = [
-                Course(
-                    title=f"Course {i}",
-                    course_link=f"https://example.com/course{i}",
-                    instructor=f"Instructor {i}",
-                    lessons=[],
-                )
-                for i in range(5)
-            ]
+        rag = RAGSystem(working_config)
 
-            for course in courses:
-                rag.vector_store.add_course_metadata(course)
+        # Add multiple courses
+        rag.vector_store.add_courses_metadata(sample_corpus["courses"])
 
-            analytics = rag.get_course_analytics()
+        analytics = rag.get_course_analytics()
 
-            assert analytics["total_courses"] == 5
-            assert len(analytics["course_titles"]) == 5
-            assert all(f"Course {i}" in analytics["course_titles"] for i in range(5))
+        assert analytics["total_courses"] == 5
+        assert len(analytics["course_titles"]) == 5
+        assert all(f"Course {i}" in analytics["course_titles"] for i in range(5))
 
-    def test_source_tracking_accuracy(self, working_config):
+    @pytest.mark.slow
+    def test_source_tracking_accuracy(
+        self, working_config, mocked_rag_deps, sample_corpus, last_sources
+    ):
         """Test that sources are accurately tracked and returned"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "Found relevant information"
-            )
-
-            rag = RAGSystem(working_config)
-
-            # Add course with lessons
-            course = Course(
-                title="Source Test Course",
-                course_link="https://example.com/course",
-                instructor="Test Instructor",
-                lessons=[
-                    Lesson(
-                        lesson_number=1,
-                        title="Intro",
-                        lesson_link="https://example.com/lesson1",
-                    ),
-                    Lesson(
-                        lesson_number=2,
-                        title="Advanced",
-                        lesson_link="https://example.com/lesson2",
-                    ),
-                ],
-            )
-            chunks = [
-                CourseChunk(
-                    content="Introduction content",
-                    course_title="Source Test Course",
-                    lesson_number=1,
-                    chunk_index=0,
-                ),
-                CourseChunk(
-                    content="Advanced content",
-                    course_title="Source Test Course",
-                    lesson_number=2,
-                    chunk_index=1,
-                ),
-            ]
-
-            rag.vector_store.add_course_metadata(course)
-            rag.vector_store.add_course_content(chunks)
-
-            # Mock tool manager to return specific sources
-            expected_sources = [
-                {
-                    "text": "Source Test Course - Lesson 1",
-                    "link": "https://example.com/lesson1",
-                },
-                {
-                    "text": "Source Test Course - Lesson 2",
-                    "link": "https://example.com/lesson2",
-                },
-            ]
-            rag.tool_manager.get_last_sources = Mock(return_value=expected_sources)
-
-            response, sources = rag.query("Tell me about the course content")
-
-            assert sources == expected_sources
-            assert len(sources) == 2
-            assert all("link" in source and "text" in source for source in sources)
-
-            # Verify sources were reset after retrieval
-            rag.tool_manager.reset_sources.assert_called_once()
-
-    def test_error_recovery_and_graceful_degradation(self, working_config):
+        mocked_rag_deps["ai_generator"].generate_response.return_value = (
+            "Found relevant information"
+        )
+
+        rag = RAGSystem(working_config)
+
+        # Add course with lessons
+        course, chunks = sample_corpus["lesson_course"]
+        rag.vector_store.add_course(course, chunks)
+
+        # Mock tool manager to return specific sources
+        expected_sources = [
+            {
+                "text": "Source Test Course - Lesson 1",
+                "link": "https://example.com/lesson1",
+            },
+            {
+                "text": "Source Test Course - Lesson 2",
+                "link": "https://example.com/lesson2",
+            },
+        ]
+        last_sources.return_value = expected_sources
+
+        response, sources = rag.query("Tell me about the course content")
+
+        assert sources == expected_sources
+        assert len(sources) == 2
+        assert all("link" in source and "text" in source for source in sources)
+
+    @pytest.mark.usefixtures("mocked_vector_store")
+    def test_error_recovery_and_graceful_degradation(
+        self, working_config, mocked_rag_deps, last_sources
+    ):
         """Test system recovery from various error conditions"""
-        with patch("rag_system.DocumentProcessor"), patch(
-            "rag_system.SessionManager"
-        ), patch("rag_system.AIGenerator") as mock_ai_gen:
-
-            rag = RAGSystem(working_config)
-
-            # Test 1: Vector store error during search
-            rag.vector_store.search = Mock(side_effect=Exception("ChromaDB error"))
-            rag.tool_manager.execute_tool = Mock(
-                return_value="Search temporarily unavailable"
-            )
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "I'm having trouble searching right now"
-            )
-
-            response, sources = rag.query("Search query during error")
-
-            assert "trouble searching" in response
-            assert len(sources) == 0
-
-            # Test 2: Recovery after error
-            rag.vector_store.search = Mock(
-                return_value=SearchResults(
-                    documents=["Recovered content"],
-                    metadata=[{"course_title": "Test", "lesson_number": 1}],
-                    distances=[0.1],
-                )
-            )
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[{"text": "Test - Lesson 1", "link": None}]
-            )
-            mock_ai_gen.return_value.generate_response.return_value = (
-                "System recovered, here's the information"
-            )
-
-            response, sources = rag.query("Search query after recovery")
-
-            assert "System recovered" in response
-            assert len(sources) > 0
+        rag = RAGSystem(working_config)
+
+        # Test 1: Vector store error during search
+        rag.vector_store.search.side_effect = Exception("ChromaDB error")
+        rag.tool_manager.execute_tool = Mock(
+            return_value="Search temporarily unavailable"
+        )
+        mocked_rag_deps["ai_generator"].generate_response.return_value = (
+            "I'm having trouble searching right now"
+        )
+
+        response, sources = rag.query("Search query during error")
+
+        assert "trouble searching" in response
+        assert len(sources) == 0
+
+        # Test 2: Recovery after error
+        rag.vector_store.search.side_effect = None
+        rag.vector_store.search.return_value = SearchResults(
+            documents=["Recovered content"],
+            metadata=[{"course_title": "Test", "lesson_number": 1}],
+            distances=[0.1],
+        )
+        last_sources.return_value = [{"text": "Test - Lesson 1", "link": None}]
+        mocked_rag_deps["ai_generator"].generate_response.return_value = (
+            "System recovered, here's the information"
+        )
+
+        response, sources = rag.query("Search query after recovery")
+
+        assert "System recovered" in response
+        assert len(sources) > 0
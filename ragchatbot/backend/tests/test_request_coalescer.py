@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from request_coalescer import RequestCoalescer
+
+
+class TestRequestCoalescer:
+    """Test suite for RequestCoalescer"""
+
+    def test_normalize_collapses_case_and_whitespace(self):
+        """Test that trivially different queries share a key"""
+        assert RequestCoalescer.normalize("  What is  MCP?\n") == "what is mcp?"
+
+    def test_concurrent_identical_calls_share_one_run(self, monkeypatch):
+        """Test that callers arriving mid-flight reuse the leader's result"""
+        coalescer = RequestCoalescer()
+        started = threading.Event()
+        release = threading.Event()
+        # Both followers and this thread meet once the followers have joined
+        followers_joined = threading.Barrier(3, timeout=5)
+        calls = []
+
+        claim = coalescer.claim
+
+        def claim_and_report(key):
+            future, is_leader = claim(key)
+            if not is_leader:
+                followers_joined.wait()
+            return future, is_leader
+
+        monkeypatch.setattr(coalescer, "claim", claim_and_report)
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return "answer"
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            leader = pool.submit(coalescer.run, "key", work)
+            assert started.wait(timeout=5)
+            followers = [pool.submit(coalescer.run, "key", work) for _ in range(2)]
+            followers_joined.wait()
+            release.set()
+            results = [f.result(timeout=5) for f in [leader, *followers]]
+
+        assert results == ["answer"] * 3
+        assert len(calls) == 1
+        assert coalescer._in_flight == {}
+
+    def test_sequential_calls_run_again(self):
+        """Test that nothing is cached once a call has finished"""
+        coalescer = RequestCoalescer()
+        counter = iter(range(10))
+
+        assert coalescer.run("key", lambda: next(counter)) == 0
+        assert coalescer.run("key", lambda: next(counter)) == 1
+
+    def test_errors_propagate_and_clear_the_key(self):
+        """Test that a failing call raises and does not block later calls"""
+        coalescer = RequestCoalescer()
+
+        def fail():
+            raise RuntimeError("API down")
+
+        with pytest.raises(RuntimeError, match="API down"):
+            coalescer.run("key", fail)
+
+        assert coalescer.run("key", lambda: "recovered") == "recovered"
+
+    def test_interrupted_leader_clears_the_key(self):
+        """Test that a BaseException in the leader does not strand the key"""
+        coalescer = RequestCoalescer()
+
+        def interrupt():
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            coalescer.run("key", interrupt)
+
+        assert coalescer._in_flight == {}
+        assert coalescer.run("key", lambda: "recovered") == "recovered"
+
+    def test_waiters_of_an_interrupted_leader_fail(self):
+        """Test that waiters get an ordinary error, not the leader's interrupt"""
+        coalescer = RequestCoalescer()
+        future, _ = coalescer.claim("key")
+
+        coalescer.settle("key", error=KeyboardInterrupt())
+
+        with pytest.raises(RuntimeError, match="abandoned"):
+            coalescer.wait(future)
+
+    def test_waiters_give_up_after_timeout(self):
+        """Test that a follower stops waiting on a leader that never settles"""
+        coalescer = RequestCoalescer(wait_timeout=0.01)
+        coalescer.claim("key")
+
+        with pytest.raises(TimeoutError):
+            coalescer.run("key", lambda: "never run")
@@ -0,0 +1,82 @@
+import time
+import uuid
+from unittest.mock import Mock, patch
+
+import chromadb
+import pytest
+from response_cache import SemanticCache
+
+# Deterministic 3-d embeddings so similarity is controlled by the test
+EMBEDDINGS = {
+    "What is RAG?": [1.0, 0.0, 0.0],
+    "what is rag": [0.999, 0.04, 0.0],
+    "Explain lesson 2": [0.0, 1.0, 0.0],
+    "Outline the MCP course": [0.0, 0.0, 1.0],
+}
+
+
+def fake_embedding_function(texts):
+    return [EMBEDDINGS[text] for text in texts]
+
+
+@pytest.fixture
+def cache():
+    """SemanticCache backed by an in-memory ChromaDB collection"""
+    return SemanticCache(
+        chromadb.EphemeralClient(),
+        fake_embedding_function,
+        collection_name=f"cache_{uuid.uuid4().hex}",
+    )
+
+
+class TestSemanticCache:
+    """Test suite for SemanticCache"""
+
+    def test_lookup_on_empty_cache_misses(self, cache):
+        """Test that an empty cache never returns a hit"""
+        assert cache.lookup(cache.embed("What is RAG?")) is None
+
+    def test_hit_for_similar_query(self, cache):
+        """Test that a near-identical query returns the stored answer"""
+        sources = [{"text": "RAG Course - Lesson 1", "link": None}]
+        cache.add(cache.embed("What is RAG?"), "What is RAG?", "An answer", sources)
+
+        assert cache.lookup(cache.embed("what is rag")) == ("An answer", sources)
+
+    def test_miss_below_threshold(self, cache):
+        """Test that a dissimilar query is not served from the cache"""
+        cache.add(cache.embed("What is RAG?"), "What is RAG?", "An answer", [])
+
+        assert cache.lookup(cache.embed("Explain lesson 2")) is None
+
+    def test_expired_entry_is_dropped(self, cache):
+        """Test that entries older than the TTL are treated as misses"""
+        cache.ttl_seconds = 10
+        with patch("response_cache.time.time", return_value=1000.0):
+            cache.add(cache.embed("What is RAG?"), "What is RAG?", "Stale", [])
+
+        with patch("response_cache.time.time", return_value=1011.0):
+            assert cache.lookup(cache.embed("What is RAG?")) is None
+
+        assert cache.collection.count() == 0
+
+    def test_oldest_entries_evicted(self, cache):
+        """Test that the cache keeps at most max_entries answers"""
+        cache.max_entries = 2
+        now = time.time()
+        for ts, query in enumerate(
+            ["What is RAG?", "Explain lesson 2", "Outline the MCP course"]
+        ):
+            with patch("response_cache.time.time", return_value=now + ts):
+                cache.add(cache.embed(query), query, f"Answer {ts}", [])
+
+        assert cache.collection.count() == 2
+        assert cache.lookup(cache.embed("What is RAG?")) is None
+        assert cache.lookup(cache.embed("Explain lesson 2"))[0] == "Answer 1"
+
+    def test_lookup_error_is_a_miss(self, cache):
+        """Test that backend errors degrade to a cache miss"""
+        cache.collection = Mock()
+        cache.collection.count.side_effect = Exception("ChromaDB unavailable")
+
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
@@ -1,24 +1,25 @@
-import os
-import sys
+import threading
 from unittest.mock import Mock, patch
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from models import Course, Lesson
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 from vector_store import SearchResults
 
+from .fakes import text_response, tool_block, tool_use_response
+
 
 class TestCourseSearchTool:
     """Test suite for CourseSearchTool"""
 
-    def test_get_tool_definition(self, mock_vector_store):
+    @pytest.fixture
+    def search_tool(self, fake_vector_store):
+        """CourseSearchTool over the fake store; it keeps per-search state"""
+        return CourseSearchTool(fake_vector_store)
+
+    def test_get_tool_definition(self, search_tool):
         """Test that tool definition is properly structured"""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
+        definition = search_tool.get_tool_definition()
 
         assert definition["name"] == "search_course_content"
         assert "description" in definition
@@ -28,77 +29,65 @@ class TestCourseSearchTool:
         assert "course_name" in definition["input_schema"]["properties"]
         assert "lesson_number" in definition["input_schema"]["properties"]
 
-    def test_execute_successful_search(self, mock_vector_store, mock_search_results):
+    def test_execute_successful_search(
+        self, search_tool, fake_vector_store, mock_search_results
+    ):
         """Test successful search execution with results"""
-        mock_vector_store.search.return_value = mock_search_results
-        mock_vector_store.get_lesson_link.return_value = "https://example.com/lesson1"
+        fake_vector_store.search_results = mock_search_results
+        fake_vector_store.lesson_link = "https://example.com/lesson1"
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query")
+        result = search_tool.execute("test query")
 
         # Verify search was called
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name=None, lesson_number=None
-        )
+        assert fake_vector_store.search_calls == [("test query", None, None)]
 
         # Verify result contains expected content
         assert "Sample Course" in result
         assert "This is the introduction" in result
-        assert len(tool.last_sources) == 2
-
-    def test_execute_with_course_filter(self, mock_vector_store, mock_search_results):
-        """Test search execution with course name filter"""
-        mock_vector_store.search.return_value = mock_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query", course_name="Sample Course")
-
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name="Sample Course", lesson_number=None
-        )
-
-    def test_execute_with_lesson_filter(self, mock_vector_store, mock_search_results):
-        """Test search execution with lesson number filter"""
-        mock_vector_store.search.return_value = mock_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query", lesson_number=1)
-
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name=None, lesson_number=1
-        )
-
-    def test_execute_with_both_filters(self, mock_vector_store, mock_search_results):
-        """Test search execution with both course and lesson filters"""
-        mock_vector_store.search.return_value = mock_search_results
+        assert len(search_tool.last_sources) == 2
+
+    @pytest.mark.parametrize(
+        "course_name, lesson_number",
+        [(None, None), ("Sample Course", None), (None, 1), ("Sample Course", 2)],
+        ids=["no-filter", "course", "lesson", "course-and-lesson"],
+    )
+    def test_execute_with_filters(
+        self,
+        search_tool,
+        fake_vector_store,
+        mock_search_results,
+        course_name,
+        lesson_number,
+    ):
+        """Test search execution passes course and lesson filters through"""
+        fake_vector_store.search_results = mock_search_results
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(
-            "test query", course_name="Sample Course", lesson_number=2
+        search_tool.execute(
+            "test query", course_name=course_name, lesson_number=lesson_number
         )
 
-        mock_vector_store.search.assert_called_once_with(
-            query="test query", course_name="Sample Course", lesson_number=2
-        )
+        assert fake_vector_store.search_calls == [
+            ("test query", course_name, lesson_number)
+        ]
 
-    def test_execute_empty_results(self, mock_vector_store, empty_search_results):
+    def test_execute_empty_results(
+        self, search_tool, fake_vector_store, empty_search_results
+    ):
         """Test handling of empty search results"""
-        mock_vector_store.search.return_value = empty_search_results
+        fake_vector_store.search_results = empty_search_results
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("nonexistent query")
+        result = search_tool.execute("nonexistent query")
 
         assert "No relevant content found" in result
-        assert len(tool.last_sources) == 0
+        assert len(search_tool.last_sources) == 0
 
     def test_execute_empty_results_with_filters(
-        self, mock_vector_store, empty_search_results
+        self, search_tool, fake_vector_store, empty_search_results
     ):
         """Test handling of empty results with filters applied"""
-        mock_vector_store.search.return_value = empty_search_results
+        fake_vector_store.search_results = empty_search_results
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(
+        result = search_tool.execute(
             "test query", course_name="Nonexistent Course", lesson_number=5
         )
 
@@ -106,17 +95,18 @@ class TestCourseSearchTool:
         assert "in course 'Nonexistent Course'" in result
         assert "in lesson 5" in result
 
-    def test_execute_search_error(self, mock_vector_store, error_search_results):
+    def test_execute_search_error(
+        self, search_tool, fake_vector_store, error_search_results
+    ):
         """Test handling of search errors"""
-        mock_vector_store.search.return_value = error_search_results
+        fake_vector_store.search_results = error_search_results
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query")
+        result = search_tool.execute("test query")
 
         assert result == "Vector store connection failed"
-        assert len(tool.last_sources) == 0
+        assert len(search_tool.last_sources) == 0
 
-    def test_format_results_with_lesson_links(self, mock_vector_store):
+    def test_format_results_with_lesson_links(self, search_tool, fake_vector_store):
         """Test result formatting includes lesson links when available"""
         # Create mock results with lesson data
         results = SearchResults(
@@ -126,89 +116,83 @@ class TestCourseSearchTool:
             ],
             distances=[0.1],
         )
-        mock_vector_store.search.return_value = results
-        mock_vector_store.get_lesson_link.return_value = "https://example.com/lesson1"
+        fake_vector_store.search_results = results
+        fake_vector_store.lesson_link = "https://example.com/lesson1"
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query")
+        result = search_tool.execute("test query")
 
         # Verify lesson link was requested
-        mock_vector_store.get_lesson_link.assert_called_once_with("Test Course", 1)
+        assert fake_vector_store.lesson_link_calls == [("Test Course", 1)]
 
         # Verify sources include the link
-        assert len(tool.last_sources) == 1
-        assert tool.last_sources[0]["text"] == "Test Course - Lesson 1"
-        assert tool.last_sources[0]["link"] == "https://example.com/lesson1"
+        assert len(search_tool.last_sources) == 1
+        assert search_tool.last_sources[0]["text"] == "Test Course - Lesson 1"
+        assert search_tool.last_sources[0]["link"] == "https://example.com/lesson1"
 
-    def test_format_results_without_lesson_links(self, mock_vector_store):
+    def test_format_results_without_lesson_links(self, search_tool, fake_vector_store):
         """Test result formatting when lesson links are not available"""
         results = SearchResults(
             documents=["Sample content"],
             metadata=[{"course_title": "Test Course", "lesson_number": 1}],
             distances=[0.1],
         )
-        mock_vector_store.search.return_value = results
-        mock_vector_store.get_lesson_link.return_value = None
+        fake_vector_store.search_results = results
+        fake_vector_store.lesson_link = None
 
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute("test query")
+        result = search_tool.execute("test query")
 
         # Verify sources don't include links
-        assert len(tool.last_sources) == 1
-        assert tool.last_sources[0]["link"] is None
+        assert len(search_tool.last_sources) == 1
+        assert search_tool.last_sources[0]["link"] is None
 
-    def test_format_results_lesson_link_error(self, mock_vector_store):
+    def test_format_results_lesson_link_error(self, search_tool, fake_vector_store):
         """Test result formatting when getting lesson link throws error"""
         results = SearchResults(
             documents=["Sample content"],
             metadata=[{"course_title": "Test Course", "lesson_number": 1}],
             distances=[0.1],
         )
-        mock_vector_store.search.return_value = results
-        mock_vector_store.get_lesson_link.side_effect = Exception("Link fetch error")
-
-        tool = CourseSearchTool(mock_vector_store)
+        fake_vector_store.search_results = results
+        fake_vector_store.lesson_link_error = Exception("Link fetch error")
 
         # Should not raise exception, should handle gracefully
-        result = tool.execute("test query")
+        result = search_tool.execute("test query")
 
-        assert len(tool.last_sources) == 1
-        assert tool.last_sources[0]["link"] is None
+        assert len(search_tool.last_sources) == 1
+        assert search_tool.last_sources[0]["link"] is None
 
     def test_sources_reset_between_searches(
-        self, mock_vector_store, mock_search_results
+        self, search_tool, fake_vector_store, mock_search_results
     ):
         """Test that sources are properly reset between searches"""
-        mock_vector_store.search.return_value = mock_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
+        fake_vector_store.search_results = mock_search_results
 
         # First search
-        tool.execute("first query")
-        first_sources_count = len(tool.last_sources)
+        search_tool.execute("first query")
+        first_sources_count = len(search_tool.last_sources)
 
         # Second search with different results
         empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-        tool.execute("second query")
+        fake_vector_store.search_results = empty_results
+        search_tool.execute("second query")
 
         # Sources should be empty for second search
-        assert len(tool.last_sources) == 0
+        assert len(search_tool.last_sources) == 0
 
 
 class TestCourseOutlineTool:
     """Test suite for CourseOutlineTool"""
 
-    def test_get_tool_definition(self, mock_vector_store):
+    def test_get_tool_definition(self, fake_vector_store):
         """Test that tool definition is properly structured"""
-        tool = CourseOutlineTool(mock_vector_store)
+        tool = CourseOutlineTool(fake_vector_store)
         definition = tool.get_tool_definition()
 
         assert definition["name"] == "get_course_outline"
         assert "description" in definition
         assert definition["input_schema"]["required"] == ["course_title"]
 
-    def test_execute_successful_outline(self, mock_vector_store, sample_course):
+    def test_execute_successful_outline(self, fake_vector_store, sample_course):
         """Test successful course outline retrieval"""
         # Mock course metadata
         course_metadata = [
@@ -230,9 +214,9 @@ class TestCourseOutlineTool:
                 ],
             }
         ]
-        mock_vector_store.get_all_courses_metadata.return_value = course_metadata
+        fake_vector_store.courses_metadata = course_metadata
 
-        tool = CourseOutlineTool(mock_vector_store)
+        tool = CourseOutlineTool(fake_vector_store)
         result = tool.execute("Sample Course")
 
         assert "Sample Course" in result
@@ -240,7 +224,7 @@ class TestCourseOutlineTool:
         assert "Advanced Topics" in result
         assert "Course Link:" in result
 
-    def test_execute_course_not_found(self, mock_vector_store):
+    def test_execute_course_not_found(self, fake_vector_store):
         """Test handling when course is not found"""
         course_metadata = [
             {
@@ -250,30 +234,28 @@ class TestCourseOutlineTool:
                 "lessons": [],
             }
         ]
-        mock_vector_store.get_all_courses_metadata.return_value = course_metadata
+        fake_vector_store.courses_metadata = course_metadata
 
-        tool = CourseOutlineTool(mock_vector_store)
+        tool = CourseOutlineTool(fake_vector_store)
         result = tool.execute("Nonexistent Course")
 
         assert "No course found matching" in result
         assert "Different Course" in result
 
-    def test_execute_no_courses_available(self, mock_vector_store):
+    def test_execute_no_courses_available(self, fake_vector_store):
         """Test handling when no courses are available"""
-        mock_vector_store.get_all_courses_metadata.return_value = []
+        fake_vector_store.courses_metadata = []
 
-        tool = CourseOutlineTool(mock_vector_store)
+        tool = CourseOutlineTool(fake_vector_store)
         result = tool.execute("Any Course")
 
         assert "No courses available in the system" in result
 
-    def test_execute_metadata_error(self, mock_vector_store):
+    def test_execute_metadata_error(self, fake_vector_store):
         """Test handling of metadata retrieval errors"""
-        mock_vector_store.get_all_courses_metadata.side_effect = Exception(
-            "Database error"
-        )
+        fake_vector_store.metadata_error = Exception("Database error")
 
-        tool = CourseOutlineTool(mock_vector_store)
+        tool = CourseOutlineTool(fake_vector_store)
         result = tool.execute("Sample Course")
 
         assert "Error retrieving course outline" in result
@@ -282,24 +264,25 @@ class TestCourseOutlineTool:
 class TestToolManager:
     """Test suite for ToolManager"""
 
-    def test_register_tool(self, mock_vector_store):
-        """Test tool registration"""
+    @pytest.fixture
+    def registered_manager(self, fake_vector_store):
+        """ToolManager with a CourseSearchTool already registered"""
         manager = ToolManager()
-        tool = CourseSearchTool(mock_vector_store)
-
+        tool = CourseSearchTool(fake_vector_store)
         manager.register_tool(tool)
+        return manager, tool
+
+    def test_register_tool(self, registered_manager):
+        """Test tool registration"""
+        manager, tool = registered_manager
 
         assert "search_course_content" in manager.tools
         assert manager.tools["search_course_content"] == tool
 
-    def test_get_tool_definitions(self, mock_vector_store):
+    def test_get_tool_definitions(self, registered_manager, fake_vector_store):
         """Test getting all tool definitions"""
-        manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        outline_tool = CourseOutlineTool(mock_vector_store)
-
-        manager.register_tool(search_tool)
-        manager.register_tool(outline_tool)
+        manager, _ = registered_manager
+        manager.register_tool(CourseOutlineTool(fake_vector_store))
 
         definitions = manager.get_tool_definitions()
 
@@ -308,19 +291,33 @@ class TestToolManager:
         assert "search_course_content" in tool_names
         assert "get_course_outline" in tool_names
 
-    def test_execute_tool(self, mock_vector_store, mock_search_results):
-        """Test tool execution via manager"""
-        mock_vector_store.search.return_value = mock_search_results
-
+    def test_get_tool_definitions_cached_until_register(self, fake_vector_store):
+        """Test definitions are reused until another tool is registered"""
         manager = ToolManager()
-        tool = CourseSearchTool(mock_vector_store)
-        manager.register_tool(tool)
+        manager.register_tool(CourseSearchTool(fake_vector_store))
+
+        definitions = manager.get_tool_definitions()
+        assert manager.get_tool_definitions() is definitions
+
+        manager.register_tool(CourseOutlineTool(fake_vector_store))
+
+        assert [d["name"] for d in manager.get_tool_definitions()] == [
+            "search_course_content",
+            "get_course_outline",
+        ]
+
+    def test_execute_tool(
+        self, registered_manager, fake_vector_store, mock_search_results
+    ):
+        """Test tool execution via manager"""
+        fake_vector_store.search_results = mock_search_results
+        manager, _ = registered_manager
 
         result = manager.execute_tool("search_course_content", query="test query")
 
         assert "Sample Course" in result
 
-    def test_execute_nonexistent_tool(self, mock_vector_store):
+    def test_execute_nonexistent_tool(self, fake_vector_store):
         """Test handling of nonexistent tool execution"""
         manager = ToolManager()
 
@@ -328,13 +325,12 @@ class TestToolManager:
 
         assert "Tool 'nonexistent_tool' not found" in result
 
-    def test_get_last_sources(self, mock_vector_store, mock_search_results):
+    def test_get_last_sources(
+        self, registered_manager, fake_vector_store, mock_search_results
+    ):
         """Test collecting sources from multiple tools"""
-        mock_vector_store.search.return_value = mock_search_results
-
-        manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        manager.register_tool(search_tool)
+        fake_vector_store.search_results = mock_search_results
+        manager, _ = registered_manager
 
         # Execute search to generate sources
         manager.execute_tool("search_course_content", query="test query")
@@ -342,13 +338,12 @@ class TestToolManager:
         sources = manager.get_last_sources()
         assert len(sources) == 2
 
-    def test_reset_sources(self, mock_vector_store, mock_search_results):
+    def test_reset_sources(
+        self, registered_manager, fake_vector_store, mock_search_results
+    ):
         """Test resetting sources from all tools"""
-        mock_vector_store.search.return_value = mock_search_results
-
-        manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        manager.register_tool(search_tool)
+        fake_vector_store.search_results = mock_search_results
+        manager, _ = registered_manager
 
         # Execute search to generate sources
         manager.execute_tool("search_course_content", query="test query")
@@ -357,3 +352,62 @@ class TestToolManager:
         # Reset sources
         manager.reset_sources()
         assert len(manager.get_last_sources()) == 0
+
+    def test_for_request_isolates_sources(
+        self, registered_manager, fake_vector_store, mock_search_results
+    ):
+        """Test that per-request managers keep their sources to themselves"""
+        fake_vector_store.search_results = mock_search_results
+        manager, tool = registered_manager
+
+        first = manager.for_request()
+        second = manager.for_request()
+        first.execute_tool("search_course_content", query="test query")
+
+        assert len(first.get_last_sources()) == 2
+        assert second.get_last_sources() == []
+        assert manager.get_last_sources() == []
+        assert first.tools["search_course_content"].store is tool.store
+        assert first.get_tool_definitions() == manager.get_tool_definitions()
+
+    def test_concurrent_searches_keep_sources_in_call_order(
+        self, mock_anthropic, generator
+    ):
+        """Test that parallel searches in one response report every source in order"""
+        # "slow" finishes only after "fast", so completion order is reversed
+        fast_done = threading.Event()
+
+        def search(query, course_name=None, lesson_number=None, limit=None):
+            if query == "slow":
+                fast_done.wait(timeout=1)
+            else:
+                fast_done.set()
+            return SearchResults(
+                documents=[f"{query} content"],
+                metadata=[{"course_title": f"{query} course"}],
+                distances=[0.1],
+            )
+
+        manager = ToolManager()
+        manager.register_tool(CourseSearchTool(Mock(search=Mock(side_effect=search))))
+        request_manager = manager.for_request()
+
+        mock_anthropic.messages.create.side_effect = (
+            tool_use_response(
+                tool_block("search_course_content", {"query": "slow"}, "tool_1"),
+                tool_block("search_course_content", {"query": "fast"}, "tool_2"),
+            ),
+            text_response("Answer."),
+        )
+
+        generator.generate_response(
+            "Compare",
+            tools=request_manager.get_tool_definitions(),
+            tool_manager=request_manager,
+        )
+
+        assert [source["text"] for source in request_manager.get_last_sources()] == [
+            "slow course",
+            "fast course",
+        ]
+        assert manager.get_last_sources() == []
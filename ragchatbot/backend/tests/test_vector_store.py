@@ -1,14 +1,6 @@
-import os
-import shutil
-import sys
-import tempfile
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from models import Course, CourseChunk, Lesson
 from vector_store import SearchResults, VectorStore
 
@@ -380,6 +372,72 @@ class TestVectorStore:
         # Should not call add when list is empty
         mock_content.add.assert_not_called()
 
+    @patch("vector_store.chromadb.PersistentClient")
+    @patch(
+        "vector_store.chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction"
+    )
+    def test_search_with_zero_limit_skips_chromadb(
+        self, mock_embedding_func, mock_client_class
+    ):
+        """Test a non-positive result limit returns an error without querying"""
+        store = VectorStore("/tmp/test", "all-MiniLM-L6-v2", max_results=0)
+        store.course_catalog = Mock()
+        store.course_content = Mock()
+
+        results = store.search("test query", course_name="Sample")
+
+        assert results.is_empty()
+        assert "must be positive" in results.error
+        store.course_catalog.query.assert_not_called()
+        store.course_content.query.assert_not_called()
+
+    @patch("vector_store.chromadb.PersistentClient")
+    @patch(
+        "vector_store.chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction"
+    )
+    def test_add_course_writes_each_collection_once(
+        self,
+        mock_embedding_func,
+        mock_client_class,
+        sample_course,
+        sample_course_chunks,
+    ):
+        """Test adding a course batches the catalog entry and all chunks"""
+        mock_catalog = Mock()
+        mock_content = Mock()
+        mock_client_class.return_value.get_or_create_collection.side_effect = [
+            mock_catalog,
+            mock_content,
+        ]
+
+        store = VectorStore("/tmp/test", "all-MiniLM-L6-v2")
+        store.add_course(sample_course, sample_course_chunks)
+
+        mock_catalog.add.assert_called_once()
+        assert mock_catalog.add.call_args[1]["ids"] == ["Sample Course"]
+        mock_content.add.assert_called_once()
+        assert len(mock_content.add.call_args[1]["documents"]) == 3
+
+    @patch("vector_store.chromadb.PersistentClient")
+    @patch(
+        "vector_store.chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction"
+    )
+    def test_add_courses_metadata_batches_catalog_writes(
+        self, mock_embedding_func, mock_client_class, sample_course
+    ):
+        """Test several courses reach the catalog in one add call"""
+        other_course = sample_course.model_copy(update={"title": "Other Course"})
+        store = VectorStore("/tmp/test", "all-MiniLM-L6-v2")
+        store.course_catalog = Mock()
+
+        store.add_courses_metadata([sample_course, other_course])
+        store.add_courses_metadata([])
+
+        store.course_catalog.add.assert_called_once()
+        call_args = store.course_catalog.add.call_args
+        assert call_args[1]["ids"] == ["Sample Course", "Other Course"]
+        assert [meta["lesson_count"] for meta in call_args[1]["metadatas"]] == [2, 2]
+
     @patch("vector_store.chromadb.PersistentClient")
     @patch(
         "vector_store.chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction"
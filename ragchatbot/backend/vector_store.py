@@ -1,10 +1,10 @@
+import json
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 import chromadb
 from chromadb.config import Settings
 from models import Course, CourseChunk
-from sentence_transformers import SentenceTransformer
 
 
 @dataclass
@@ -91,6 +91,13 @@ class VectorStore:
         Returns:
             SearchResults object with documents and metadata
         """
+        # Use provided limit or fall back to configured max_results
+        search_limit = limit if limit is not None else self.max_results
+        if search_limit <= 0:
+            return SearchResults.empty(
+                f"Search limit must be positive, got {search_limit}"
+            )
+
         # Step 1: Resolve course name if provided
         course_title = None
         if course_name:
@@ -102,9 +109,6 @@ class VectorStore:
         filter_dict = self._build_filter(course_title, lesson_number)
 
         # Step 3: Search course content
-        # Use provided limit or fall back to configured max_results
-        search_limit = limit if limit is not None else self.max_results
-
         try:
             results = self.course_content.query(
                 query_texts=[query], n_results=search_limit, where=filter_dict
@@ -149,37 +153,38 @@ class VectorStore:
 
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
-
-        course_text = course.title
-
-        # Build lessons metadata and serialize as JSON string
-        lessons_metadata = []
-        for lesson in course.lessons:
-            lessons_metadata.append(
-                {
-                    "lesson_number": lesson.lesson_number,
-                    "lesson_title": lesson.title,
-                    "lesson_link": lesson.lesson_link,
-                }
-            )
+        self.add_courses_metadata([course])
+
+    def add_courses_metadata(self, courses: List[Course]):
+        """Add several courses to the catalog in a single batch"""
+        if not courses:
+            return
 
         self.course_catalog.add(
-            documents=[course_text],
-            metadatas=[
-                {
-                    "title": course.title,
-                    "instructor": course.instructor,
-                    "course_link": course.course_link,
-                    "lessons_json": json.dumps(
-                        lessons_metadata
-                    ),  # Serialize as JSON string
-                    "lesson_count": len(course.lessons),
-                }
-            ],
-            ids=[course.title],
+            documents=[course.title for course in courses],
+            metadatas=[self._catalog_metadata(course) for course in courses],
+            ids=[course.title for course in courses],
         )
 
+    @staticmethod
+    def _catalog_metadata(course: Course) -> Dict[str, Any]:
+        """Build a course's catalog metadata, with lessons serialized as JSON"""
+        lessons_metadata = [
+            {
+                "lesson_number": lesson.lesson_number,
+                "lesson_title": lesson.title,
+                "lesson_link": lesson.lesson_link,
+            }
+            for lesson in course.lessons
+        ]
+        return {
+            "title": course.title,
+            "instructor": course.instructor,
+            "course_link": course.course_link,
+            "lessons_json": json.dumps(lessons_metadata),
+            "lesson_count": len(course.lessons),
+        }
+
     def add_course_content(self, chunks: List[CourseChunk]):
         """Add course content chunks to the vector store"""
         if not chunks:
@@ -202,6 +207,11 @@ class VectorStore:
 
         self.course_content.add(documents=documents, metadatas=metadatas, ids=ids)
 
+    def add_course(self, course: Course, chunks: List[CourseChunk]):
+        """Add a course's catalog entry and all of its chunks in one batch each"""
+        self.add_course_metadata(course)
+        self.add_course_content(chunks)
+
     def clear_all_data(self):
         """Clear all data from both collections"""
         try:
@@ -238,8 +248,6 @@ class VectorStore:
 
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
-
         try:
             results = self.course_catalog.get()
             if results and "metadatas" in results:
@@ -274,8 +282,6 @@ class VectorStore:
 
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
-
         try:
             # Get course by ID (title is the ID)
             results = self.course_catalog.get(ids=[course_title])
@@ -74,7 +74,7 @@ async function sendMessage() {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
     try {
-        const response = await fetch(`${API_URL}/query`, {
+        const response = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -87,16 +87,56 @@ async function sendMessage() {
 
         if (!response.ok) throw new Error('Query failed');
 
-        const data = await response.json();
-        
-        // Update session ID if new
-        if (!currentSessionId) {
-            currentSessionId = data.session_id;
-        }
+        // Read server-sent events and render the answer as it arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        let streamingContent = null;
 
-        // Replace loading message with response
-        loadingMessage.remove();
-        addMessage(data.answer, 'assistant', data.sources);
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const rawEvent of events) {
+                if (!rawEvent.startsWith('data: ')) continue;
+                const event = JSON.parse(rawEvent.slice('data: '.length));
+
+                if (event.type === 'delta') {
+                    if (!streamingContent) {
+                        // Swap the loading dots for the message being streamed
+                        loadingMessage.innerHTML = '<div class="message-content"></div>';
+                        streamingContent = loadingMessage.querySelector('.message-content');
+                    }
+                    answer += event.text;
+                    streamingContent.innerHTML = marked.parse(answer);
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (event.type === 'reset') {
+                    // The text so far led into a tool call, so it is not the answer;
+                    // show the loading dots again until the answer starts
+                    answer = '';
+                    if (streamingContent) {
+                        loadingMessage.innerHTML = createLoadingMessage().innerHTML;
+                        streamingContent = null;
+                    }
+                } else if (event.type === 'done') {
+                    // Update session ID if new
+                    if (!currentSessionId) {
+                        currentSessionId = event.session_id;
+                    }
+
+                    // Re-render the finished answer together with its sources
+                    loadingMessage.remove();
+                    addMessage(answer, 'assistant', event.sources);
+                } else if (event.type === 'error') {
+                    throw new Error(event.detail);
+                }
+            }
+        }
 
     } catch (error) {
         // Replace loading message with error